@@ -1,21 +1,48 @@
 """Monitoring API Endpoints"""
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
+from dateutil.parser import isoparse
+from fastapi_cache.decorator import cache
 
-from app.database import get_db
+from app.cache import (
+    DRIFT_NAMESPACE, METRICS_NAMESPACE, drift_key_builder, invalidate, query_key_builder
+)
+from app.config import settings
+from app.database import get_db, naive_utc
+from app.models import SystemHealth
 from app.schemas import DriftReportResponse, MetricsTimeSeriesResponse
 from app.services.monitoring_service import MonitoringService
 
 router = APIRouter(prefix="/api/v1/monitoring", tags=["monitoring"])
 
 
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, trying the stdlib fast path first"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    
+    # Python < 3.11 rejects the 'Z' suffix
+    if value.endswith('Z'):
+        try:
+            return datetime.fromisoformat(value[:-1] + '+00:00')
+        except ValueError:
+            pass
+    
+    # Exotic formats (week dates, basic format, etc.)
+    return isoparse(value)
+
+
 @router.get("/drift/latest")
+@cache(expire=settings.DRIFT_CACHE_TTL, namespace=DRIFT_NAMESPACE, key_builder=drift_key_builder)
 async def get_latest_drift_report(
     hours: Optional[int] = Query(default=1, description="Time window in hours"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get latest drift detection report
@@ -30,12 +57,33 @@ async def get_latest_drift_report(
         raise HTTPException(status_code=500, detail=f"Failed to generate drift report: {str(e)}")
 
 
+@router.post("/baseline/refresh")
+async def refresh_baseline(db: AsyncSession = Depends(get_db)):
+    """
+    Rebuild the drift baseline of the serving model version
+    
+    The baseline is cached once complete; call this after replacing the
+    baseline data (cached drift reports are dropped as well).
+    """
+    try:
+        profile = await MonitoringService(db).refresh_baseline()
+        await invalidate(DRIFT_NAMESPACE)
+        return {
+            'model_version': settings.MODEL_VERSION,
+            'features': len(profile['feature_names']),
+            'rows': int(profile['n_valid'].max(initial=0))
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refresh baseline: {str(e)}")
+
+
 @router.get("/metrics/timeseries")
+@cache(expire=settings.METRICS_CACHE_TTL, namespace=METRICS_NAMESPACE, key_builder=query_key_builder)
 async def get_metrics_timeseries(
     start: Optional[str] = Query(default=None, description="Start time (ISO format)"),
     end: Optional[str] = Query(default=None, description="End time (ISO format)"),
     interval: Optional[str] = Query(default="1h", description="Time interval"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get time series metrics
@@ -49,12 +97,12 @@ async def get_metrics_timeseries(
         if end is None:
             end_time = datetime.utcnow()
         else:
-            end_time = datetime.fromisoformat(end.replace('Z', '+00:00'))
+            end_time = naive_utc(_parse_iso(end))
         
         if start is None:
             start_time = end_time - timedelta(hours=24)
         else:
-            start_time = datetime.fromisoformat(start.replace('Z', '+00:00'))
+            start_time = naive_utc(_parse_iso(start))
         
         service = MonitoringService(db)
         data = await service.get_metrics_timeseries(
@@ -68,16 +116,14 @@ async def get_metrics_timeseries(
 
 
 @router.get("/health")
-async def get_system_health(db: Session = Depends(get_db)):
+async def get_system_health(db: AsyncSession = Depends(get_db)):
     """Get system health status"""
-    from app.models import SystemHealth
-    from sqlalchemy import desc
-    
     try:
         # Get latest health records
-        health_records = db.query(SystemHealth).order_by(
-            desc(SystemHealth.timestamp)
-        ).limit(5).all()
+        result = await db.execute(
+            select(SystemHealth).order_by(desc(SystemHealth.timestamp)).limit(5)
+        )
+        health_records = result.scalars().all()
         
         if not health_records:
             return {
@@ -1,7 +1,7 @@
 """Prediction API Endpoints"""
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.schemas import (
@@ -17,20 +17,20 @@ router = APIRouter(prefix="/api/v1", tags=["predictions"])
 @router.post("/predict", response_model=PredictionResponse)
 async def make_prediction(
     request: PredictionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Make a prediction on transaction
     
     - **transaction_id**: Unique transaction identifier
-    - **features**: Dictionary of feature values
+    - **features**: Feature values (all 12 model features, no extras)
     - **timestamp**: Optional timestamp
     """
     try:
         service = PredictionService(db)
         result = await service.make_prediction(
             transaction_id=request.transaction_id,
-            features=request.features,
+            features=request.features.model_dump(),
             timestamp=request.timestamp
         )
         return result
@@ -43,7 +43,7 @@ async def make_prediction(
 @router.post("/feedback", response_model=FeedbackResponse)
 async def submit_feedback(
     request: FeedbackRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Submit ground truth feedback for a prediction
@@ -70,7 +70,7 @@ async def submit_feedback(
 
 
 @router.get("/model/info", response_model=ModelInfo)
-async def get_model_info(db: Session = Depends(get_db)):
+async def get_model_info(db: AsyncSession = Depends(get_db)):
     """Get current model information"""
     try:
         service = PredictionService(db)
@@ -1,55 +1,105 @@
 """WebSocket API for Real-time Updates"""
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import Dict, Set
 import asyncio
-import json
 import logging
+import orjson
 from datetime import datetime
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["websocket"])
 
 
 class ConnectionManager:
-    """Manage WebSocket connections"""
+    """
+    Manage WebSocket connections
+    
+    Each connection gets a bounded outbound queue drained by its own
+    writer task, so broadcasting never awaits a network write and a slow
+    client can't hold up the others.
+    """
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         """Accept and store new connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._outboxes[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer_loop(websocket, queue))
+        self.active_connections.add(websocket)
+        logger.info("WebSocket connected. Total connections: %d", len(self.active_connections))
     
     def disconnect(self, websocket: WebSocket):
-        """Remove connection"""
-        self.active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        """Remove connection and stop its writer task"""
+        self._outboxes.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        
+        if websocket in self.active_connections:
+            self.active_connections.discard(websocket)
+            logger.info("WebSocket disconnected. Total connections: %d", len(self.active_connections))
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to specific connection"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
+        self._enqueue(websocket, self._serialize(message))
     
     async def broadcast(self, message: dict):
         """Broadcast message to all connections"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to connection: {e}")
-                disconnected.append(connection)
+        if not self.active_connections:
+            return
         
-        # Remove disconnected clients
-        for connection in disconnected:
-            if connection in self.active_connections:
-                self.active_connections.remove(connection)
+        # Serialize once; each client's writer task does the actual send
+        payload = self._serialize(message)
+        for connection in list(self.active_connections):
+            self._enqueue(connection, payload)
+    
+    def _serialize(self, message: dict) -> str:
+        """Encode a message to JSON text"""
+        return orjson.dumps(
+            message,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    
+    def _enqueue(self, websocket: WebSocket, payload: str):
+        """Queue a payload for a connection, dropping it if it can't keep up"""
+        queue = self._outboxes.get(websocket)
+        if queue is None:
+            return
+        
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow WebSocket client: send queue full")
+            self.disconnect(websocket)
+            asyncio.create_task(self._close(websocket))
+    
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain a connection's outbound queue"""
+        try:
+            while True:
+                payload = await queue.get()
+                await websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to connection: {e}")
+            self.disconnect(websocket)
+    
+    async def _close(self, websocket: WebSocket):
+        """Close a dropped connection so its receive loop exits"""
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
 
 
 # Global connection manager
@@ -73,7 +123,7 @@ async def websocket_metrics(websocket: WebSocket):
         await manager.send_personal_message(
             {
                 "type": "connected",
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.utcnow(),
                 "message": "Connected to metrics stream"
             },
             websocket
@@ -90,16 +140,16 @@ async def websocket_metrics(websocket: WebSocket):
                 
                 # Process client message if needed
                 try:
-                    message = json.loads(data)
+                    message = orjson.loads(data)
                     if message.get('type') == 'ping':
                         await manager.send_personal_message(
                             {
                                 "type": "pong",
-                                "timestamp": datetime.utcnow().isoformat()
+                                "timestamp": datetime.utcnow()
                             },
                             websocket
                         )
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     pass
                     
             except asyncio.TimeoutError:
@@ -107,7 +157,7 @@ async def websocket_metrics(websocket: WebSocket):
                 await manager.send_personal_message(
                     {
                         "type": "heartbeat",
-                        "timestamp": datetime.utcnow().isoformat()
+                        "timestamp": datetime.utcnow()
                     },
                     websocket
                 )
@@ -129,7 +179,7 @@ async def broadcast_metrics_update(data: dict):
     """
     message = {
         "type": "metrics_update",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),
         "data": data
     }
     await manager.broadcast(message)
@@ -144,7 +194,7 @@ async def broadcast_alert(alert: dict):
     """
     message = {
         "type": "alert",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),
         "data": alert
     }
     await manager.broadcast(message)
@@ -159,7 +209,7 @@ async def broadcast_drift_detected(drift_data: dict):
     """
     message = {
         "type": "drift_detected",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),
         "data": drift_data
     }
     await manager.broadcast(message)
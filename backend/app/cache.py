@@ -0,0 +1,94 @@
+"""Redis-backed response caching"""
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cache namespaces (keys are "<prefix>:<namespace>:<hash>")
+DRIFT_NAMESPACE = "drift"
+METRICS_NAMESPACE = "metrics"
+
+
+def init_cache():
+    """Initialize the response cache backend"""
+    redis = aioredis.from_url(settings.REDIS_URL)
+    FastAPICache.init(RedisBackend(redis), prefix=settings.CACHE_PREFIX)
+
+
+def _namespaced(namespace: Optional[str]) -> str:
+    """
+    Key namespace carrying the cache prefix exactly once
+
+    fastapi-cache2 0.2.1 hands builders the bare namespace, later releases
+    pass "<prefix>:<namespace>"; either way keys must start with the
+    "<prefix>:<namespace>" that FastAPICache.clear() deletes.
+    """
+    prefix = FastAPICache.get_prefix()
+    namespace = namespace or ""
+    if prefix and not namespace.startswith(f"{prefix}:"):
+        namespace = f"{prefix}:{namespace}"
+    return namespace
+
+
+def query_key_builder(
+    func: Callable,
+    namespace: Optional[str] = "",
+    request=None,
+    response=None,
+    args: Optional[tuple] = None,
+    kwargs: Optional[dict] = None
+) -> str:
+    """
+    Build a cache key from an endpoint's query parameters
+
+    Injected dependencies such as the DB session are excluded, otherwise
+    every request would get a unique key.
+    """
+    params = sorted(
+        (name, value) for name, value in (kwargs or {}).items()
+        if name != "db"
+    )
+    digest = hashlib.md5(
+        f"{func.__module__}:{func.__name__}:{params}".encode()
+    ).hexdigest()
+    return f"{_namespaced(namespace)}:{digest}"
+
+
+def drift_key_builder(
+    func: Callable,
+    namespace: Optional[str] = "",
+    request=None,
+    response=None,
+    args: Optional[tuple] = None,
+    kwargs: Optional[dict] = None
+) -> str:
+    """
+    Build a drift report cache key from the model version, the hour the
+    window ends in and the window length
+
+    Every dashboard polling the same window length shares one entry,
+    refreshed at most every DRIFT_CACHE_TTL seconds (the window slides, so
+    a cached report can lag the live one by up to that long), and a new
+    model version never serves the previous version's report. Entries are
+    dropped early only when the baseline is rebuilt.
+    """
+    hours = (kwargs or {}).get("hours")
+    window_end = datetime.utcnow().strftime("%Y%m%d%H")
+    return f"{_namespaced(namespace)}:{settings.MODEL_VERSION}:{window_end}:{hours}"
+
+
+async def invalidate(namespace: str):
+    """Drop all cached responses in a namespace"""
+    try:
+        await FastAPICache.clear(namespace=namespace)
+    except Exception as e:
+        logger.warning(f"Error clearing cache namespace '{namespace}': {e}")
@@ -1,50 +1,93 @@
 """Database connection and session management"""
 
-from sqlalchemy import create_engine, event
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection, AsyncSession, async_sessionmaker, create_async_engine
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
 import logging
+import orjson
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Create engine with connection pooling optimized for 8GB RAM
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,  # Small pool size for low RAM usage
-    max_overflow=10,
+
+def _async_database_url(url: str) -> str:
+    """Point a postgresql:// URL at the asyncpg driver"""
+    for scheme in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            return "postgresql+asyncpg://" + url[len(scheme):]
+    return url
+
+
+def json_serializer(value) -> str:
+    """Serialize JSON/JSONB bind values with orjson (compact output)"""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def naive_utc(value: datetime) -> datetime:
+    """
+    Convert a datetime to naive UTC
+    
+    Timestamp columns are TIMESTAMP WITHOUT TIME ZONE holding UTC, and
+    asyncpg refuses to bind timezone-aware values to them.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Create engine with connection pooling sized for concurrent dashboard and
+# prediction traffic (50 connections at most, well under Postgres' default
+# max_connections of 100)
+engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,  # Recycle connections after 1 hour
+    pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections (default 30 min)
+    pool_use_lifo=True,  # Reuse the most recently returned (warm) connection
+    query_cache_size=1200,  # Compiled statement cache
+    insertmanyvalues_page_size=1000,
+    connect_args={"server_settings": {"jit": "off"}},  # JIT only hurts short OLTP queries
+    json_serializer=json_serializer,  # JSONB features/contributions on every prediction
+    json_deserializer=orjson.loads,
     echo=False
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    engine,
+    expire_on_commit=False,
+    autoflush=False
+)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db() -> Session:
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
     Dependency for getting database sessions
     
     Usage:
-        def my_endpoint(db: Session = Depends(get_db)):
+        async def my_endpoint(db: AsyncSession = Depends(get_db)):
             ...
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
-    """Initialize database - create tables if they don't exist"""
+async def init_db(conn: Optional[AsyncConnection] = None):
+    """
+    Initialize database - create tables if they don't exist
+    
+    Args:
+        conn: Connection to use (default: a new transaction on the engine)
+    """
     try:
         # Import all models here so they're registered with Base
         from app.models import (
@@ -59,21 +102,32 @@ def init_db():
         )
         
         # Create tables
-        Base.metadata.create_all(bind=engine)
+        if conn is not None:
+            await conn.run_sync(Base.metadata.create_all)
+        else:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables initialized successfully")
-        
+    
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         raise
 
 
-def check_db_connection() -> bool:
-    """Check if database is accessible"""
+async def check_db_connection(conn: Optional[AsyncConnection] = None) -> bool:
+    """
+    Check if database is accessible
+    
+    Args:
+        conn: Connection to probe (default: check one out of the pool)
+    """
     try:
-        with engine.connect() as conn:
-            conn.execute("SELECT 1")
+        if conn is not None:
+            await conn.execute(text("SELECT 1"))
+        else:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         return False
-
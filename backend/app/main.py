@@ -2,15 +2,19 @@
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import logging
 import time
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.database import init_db, check_db_connection
+from app.database import SessionLocal, engine, init_db, check_db_connection
+from app.cache import init_cache
 from app.api import prediction, monitoring, websocket
 from app.ml.model import get_model
+from app.services.monitoring_service import MonitoringService
+from app.services.batch_predictor import get_batch_predictor
+from app.services.prediction_batcher import get_prediction_batcher
 
 # Configure logging
 logging.basicConfig(
@@ -31,14 +35,27 @@ async def lifespan(app: FastAPI):
     # Initialize database
     logger.info("Initializing database...")
     try:
-        init_db()
-        if check_db_connection():
+        async with engine.begin() as conn:
+            await init_db(conn)
+            db_ok = await check_db_connection(conn)
+        if db_ok:
             logger.info("✓ Database connection successful")
         else:
             logger.warning("✗ Database connection failed")
     except Exception as e:
         logger.error(f"✗ Database initialization error: {e}")
     
+    # Initialize response cache
+    logger.info("Initializing response cache...")
+    init_cache()
+    
+    # Precompute drift baseline histograms
+    try:
+        async with SessionLocal() as db:
+            await MonitoringService(db).get_baseline_profile()
+    except Exception as e:
+        logger.warning(f"✗ Drift baseline warm-up failed: {e}")
+    
     # Load ML model
     logger.info("Loading ML model...")
     try:
@@ -50,6 +67,10 @@ async def lifespan(app: FastAPI):
         logger.error(f"✗ Model loading error: {e}")
         logger.warning("  Prediction endpoints will not work until model is trained")
     
+    # Start micro-batched inference and batched prediction logging
+    await get_batch_predictor().start()
+    await get_prediction_batcher().start()
+    
     logger.info("=" * 60)
     logger.info("Application started successfully!")
     logger.info(f"API available at: http://0.0.0.0:8000")
@@ -60,6 +81,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down application...")
+    await get_batch_predictor().stop()
+    await get_prediction_batcher().stop()
+    await engine.dispose()
 
 
 # Create FastAPI app
@@ -67,6 +91,7 @@ app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
     description=settings.API_DESCRIPTION,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -96,29 +121,43 @@ async def add_process_time_header(request: Request, call_next):
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 
+# Cached health probe result: (db_status, model_status, monotonic time)
+_health_cache = None
+
+
 # Health check endpoint
 @app.get("/health", tags=["health"])
 async def health_check():
     """
     Health check endpoint for Docker healthcheck
     
-    Returns basic health status of the application
+    Returns basic health status of the application. Probe results are
+    cached for HEALTH_CACHE_SECONDS so frequent healthchecks don't hit
+    the connection pool on every call.
     """
-    db_status = check_db_connection()
+    global _health_cache
     
-    # Check model status
-    model_status = False
-    try:
-        model = get_model()
-        model_status = model.health_check()
-    except:
-        pass
+    now = time.monotonic()
+    if _health_cache is not None and now - _health_cache[2] < settings.HEALTH_CACHE_SECONDS:
+        db_status, model_status, _ = _health_cache
+    else:
+        db_status = await check_db_connection()
+        
+        # Check model status
+        model_status = False
+        try:
+            model = get_model()
+            model_status = model.health_check()
+        except:
+            pass
+        
+        _health_cache = (db_status, model_status, now)
     
     overall_status = "healthy" if (db_status and model_status) else "degraded"
     
@@ -155,6 +194,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
+        loop="uvloop",
+        http="httptools",
         reload=True,
         log_level="info"
     )
@@ -3,8 +3,14 @@
 import numpy as np
 import pandas as pd
 from scipy import stats
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import logging
+import warnings
+
+from app.ml.drift_kernels import (
+    NUMBA_AVAILABLE, PSI_EPSILON, counts_batch, counts_from_values, drift_batch,
+    ks_statistic_sorted, psi_from_counts, psi_from_samples
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +40,9 @@ class DriftDetector:
         self.ks_threshold = ks_threshold
         self.n_bins = n_bins
         
+        # Set by fit_baseline
+        self.baseline_profile: Optional[Dict] = None
+    
     def calculate_psi(
         self,
         baseline: np.ndarray,
@@ -54,13 +63,24 @@ class DriftDetector:
             baseline: Baseline distribution
             current: Current distribution
             n_bins: Number of bins (default: self.n_bins)
-            
+        
         Returns:
             PSI score
         """
         if n_bins is None:
             n_bins = self.n_bins
         
+        if NUMBA_AVAILABLE:
+            # NaN filtering, min/max, binning and the log-ratio sum in one kernel
+            psi, n_baseline, n_current = psi_from_samples(
+                np.ascontiguousarray(baseline, dtype=np.float64),
+                np.ascontiguousarray(current, dtype=np.float64),
+                n_bins
+            )
+            if n_baseline == 0 or n_current == 0:
+                logger.warning("Empty arrays provided to PSI calculation")
+            return float(psi)
+        
         # Remove NaN values
         baseline = baseline[~np.isnan(baseline)]
         current = current[~np.isnan(current)]
@@ -78,32 +98,29 @@ class DriftDetector:
             if min_val == max_val:
                 return 0.0
             
-            # Create bin edges
-            bins = np.linspace(min_val, max_val, n_bins + 1)
-            bins[0] = -np.inf  # Catch values below minimum
-            bins[-1] = np.inf  # Catch values above maximum
-            
-            # Calculate histograms
-            baseline_counts, _ = np.histogram(baseline, bins=bins)
-            current_counts, _ = np.histogram(current, bins=bins)
+            # Calculate histograms over equal-width bins. The range spans both
+            # arrays, so no value falls outside it, and a bins/range pair
+            # takes numpy's uniform-bin fast path
+            baseline_counts, _ = np.histogram(baseline, bins=n_bins, range=(min_val, max_val))
+            current_counts, _ = np.histogram(current, bins=n_bins, range=(min_val, max_val))
             
             # Convert to percentages (avoid division by zero)
             baseline_percents = baseline_counts / len(baseline)
             current_percents = current_counts / len(current)
             
             # Add small epsilon to avoid log(0)
-            epsilon = 1e-10
-            baseline_percents = baseline_percents + epsilon
-            current_percents = current_percents + epsilon
+            baseline_percents += PSI_EPSILON
+            current_percents += PSI_EPSILON
             
-            # Calculate PSI
-            psi = np.sum(
-                (current_percents - baseline_percents) * 
-                np.log(current_percents / baseline_percents)
-            )
+            # Calculate PSI; the log ratio reuses the current buffer and the
+            # sum of products is one dot, so no temporaries are allocated
+            diff = current_percents - baseline_percents
+            np.divide(current_percents, baseline_percents, out=current_percents)
+            np.log(current_percents, out=current_percents)
+            psi = diff @ current_percents
             
             return float(psi)
-            
+        
         except Exception as e:
             logger.error(f"Error calculating PSI: {e}")
             return 0.0
@@ -121,59 +138,226 @@ class DriftDetector:
         Args:
             baseline: Baseline distribution
             current: Current distribution
-            
+        
         Returns:
             (statistic, p_value)
         """
-        # Remove NaN values
-        baseline = baseline[~np.isnan(baseline)]
-        current = current[~np.isnan(current)]
+        # Sorting moves NaN to the end, so the valid values are a prefix view
+        baseline = np.sort(baseline)
+        current = np.sort(current)
+        baseline = baseline[:self._n_valid_sorted(baseline)]
+        current = current[:self._n_valid_sorted(current)]
         
         if len(baseline) == 0 or len(current) == 0:
             return 0.0, 1.0
         
         try:
-            statistic, p_value = stats.ks_2samp(baseline, current)
+            statistic = ks_statistic_sorted(baseline, current)
+            
+            # Asymptotic p-value, as ks_2samp(method='asymp')
+            n, m = len(baseline), len(current)
+            p_value = stats.kstwo.sf(statistic, max(round(n * m / (n + m)), 1))
             return float(statistic), float(p_value)
         except Exception as e:
             logger.error(f"Error in KS test: {e}")
             return 0.0, 1.0
     
-    def detect_feature_drift(
+    def fit_baseline(
         self,
-        baseline_df: pd.DataFrame,
-        current_df: pd.DataFrame,
+        baseline_df: Union[pd.DataFrame, np.ndarray],
         feature_names: List[str] = None
+    ) -> Dict:
+        """
+        Precompute the baseline side of the drift statistics
+        
+        The baseline is sorted once per feature, binned into its PSI
+        histogram and summarized, so repeated drift checks against the same
+        baseline only have to process the current window. The profile is
+        also kept on the detector for calculate_psi_incremental; callers
+        that check many windows keep the returned profile and pass it to
+        detect_feature_drift.
+        
+        Args:
+            baseline_df: Baseline feature DataFrame, or an (n_samples,
+                n_features) array whose columns are feature_names
+            feature_names: List of features to profile (None = all;
+                required for an array)
+        
+        Returns:
+            Baseline profile for detect_feature_drift
+        """
+        self.baseline_profile = self._build_profile(baseline_df, feature_names)
+        return self.baseline_profile
+    
+    def _build_profile(
+        self,
+        baseline_df: Union[pd.DataFrame, np.ndarray],
+        feature_names: Optional[List[str]]
+    ) -> Dict:
+        """fit_baseline's profile, without storing it on the detector"""
+        if isinstance(baseline_df, np.ndarray):
+            feature_names = list(feature_names)
+            values = baseline_df.T
+        else:
+            if feature_names is None:
+                feature_names = list(baseline_df.columns)
+            feature_names = [f for f in feature_names if f in baseline_df.columns]
+            values = baseline_df[feature_names].to_numpy(dtype=np.float64).T
+        
+        # One C-contiguous row per feature, NaN sorted to the end of each row
+        baseline_sorted = np.array(values, dtype=np.float64, order='C')
+        baseline_sorted.sort(axis=1)
+        baseline_n = self._n_valid_sorted(baseline_sorted)
+        
+        # Equal-width bins over the baseline range, open at both ends
+        mins = baseline_sorted[:, 0]
+        maxs = baseline_sorted[np.arange(len(feature_names)), np.maximum(baseline_n - 1, 0)]
+        edges = mins[:, None] + (maxs - mins)[:, None] * np.linspace(0.0, 1.0, self.n_bins + 1)
+        edges[:, 0] = -np.inf
+        edges[:, -1] = np.inf
+        
+        baseline_counts = counts_batch(baseline_sorted, baseline_n, edges)
+        
+        return {
+            'feature_names': feature_names,
+            'index': {name: i for i, name in enumerate(feature_names)},
+            'sorted': baseline_sorted,
+            'n_valid': baseline_n,
+            'counts': baseline_counts,
+            'edges': edges,
+            'stats': self._summary_stats(baseline_sorted, baseline_n)
+        }
+    
+    def bin_against_baseline(self, feature: str, values: np.ndarray) -> np.ndarray:
+        """
+        Histogram values on a feature's fitted baseline bins
+        
+        Only O(n_bins) state is produced, so a monitor can add up the counts
+        of successive windows instead of keeping the raw values.
+        
+        Args:
+            feature: Feature name (must be in the fitted baseline)
+            values: Current values for the feature
+        
+        Returns:
+            Bin counts
+        """
+        i = self._baseline_row(feature)
+        return counts_from_values(
+            np.ascontiguousarray(values, dtype=np.float64),
+            self.baseline_profile['edges'][i]
+        )
+    
+    def calculate_psi_incremental(
+        self,
+        feature: str,
+        current: np.ndarray = None,
+        current_counts: np.ndarray = None
+    ) -> float:
+        """
+        Calculate PSI against the fitted baseline
+        
+        Only the current side is binned; baseline edges and counts come from
+        fit_baseline.
+        
+        Args:
+            feature: Feature name (must be in the fitted baseline)
+            current: Current values
+            current_counts: Pre-accumulated counts from bin_against_baseline
+                (used instead of current)
+        
+        Returns:
+            PSI score
+        """
+        i = self._baseline_row(feature)
+        if current_counts is None:
+            current_counts = self.bin_against_baseline(feature, current)
+        
+        return float(psi_from_counts(self.baseline_profile['counts'][i], current_counts))
+    
+    def _baseline_row(self, feature: str) -> int:
+        """Row of a feature in the fitted baseline profile"""
+        if self.baseline_profile is None:
+            raise ValueError("No baseline fitted; call fit_baseline first")
+        if feature not in self.baseline_profile['index']:
+            raise ValueError(f"Feature {feature} not in fitted baseline")
+        return self.baseline_profile['index'][feature]
+    
+    def detect_feature_drift(
+        self,
+        baseline_df: Optional[pd.DataFrame],
+        current_df: Union[pd.DataFrame, np.ndarray],
+        feature_names: List[str] = None,
+        baseline_profile: Optional[Dict] = None
     ) -> List[Dict]:
         """
         Detect drift for multiple features
         
         Args:
-            baseline_df: Baseline feature DataFrame
-            current_df: Current feature DataFrame
+            baseline_df: Baseline feature DataFrame (unused if a profile is
+                given)
+            current_df: Current feature DataFrame, or an (n_samples,
+                n_features) array whose columns are feature_names (or the
+                profile's features if None)
             feature_names: List of features to check (None = all)
-            
+            baseline_profile: Cached result of fit_baseline
+        
         Returns:
             List of drift reports per feature
         """
+        if baseline_profile is None:
+            baseline_profile = self._build_profile(baseline_df, feature_names)
+        
         if feature_names is None:
-            feature_names = list(baseline_df.columns)
+            feature_names = baseline_profile['feature_names']
         
-        drift_reports = []
+        profile_index = baseline_profile['index']
+        if isinstance(current_df, np.ndarray):
+            current_columns = {name: j for j, name in enumerate(feature_names)}
+        else:
+            current_columns = current_df.columns
         
+        features = []
         for feature in feature_names:
-            if feature not in baseline_df.columns or feature not in current_df.columns:
+            if feature not in profile_index or feature not in current_columns:
                 logger.warning(f"Feature {feature} not found in data")
                 continue
-            
-            baseline_values = baseline_df[feature].values
-            current_values = current_df[feature].values
-            
-            # Calculate PSI
-            psi_score = self.calculate_psi(baseline_values, current_values)
-            
-            # Perform KS test
-            ks_statistic, ks_p_value = self.ks_test(baseline_values, current_values)
+            features.append(feature)
+        
+        if not features:
+            return []
+        
+        rows = np.array([profile_index[f] for f in features])
+        
+        # One C-contiguous row per feature; the kernel sorts it in place
+        if isinstance(current_df, np.ndarray):
+            current_sorted = np.ascontiguousarray(
+                current_df.T[[current_columns[f] for f in features]], dtype=np.float64
+            )
+        else:
+            current_sorted = np.ascontiguousarray(
+                current_df[features].to_numpy(dtype=np.float64).T
+            )
+        
+        # Sort, PSI and KS for all features in one parallel kernel call
+        psi_scores, ks_statistics, current_n = drift_batch(
+            np.ascontiguousarray(baseline_profile['sorted'][rows]),
+            baseline_profile['n_valid'][rows],
+            np.ascontiguousarray(baseline_profile['counts'][rows]),
+            np.ascontiguousarray(baseline_profile['edges'][rows]),
+            current_sorted
+        )
+        ks_p_values = self._ks_p_values(
+            ks_statistics, baseline_profile['n_valid'][rows], current_n
+        )
+        current_stats_list = self._summary_stats(current_sorted, current_n)
+        
+        drift_reports = []
+        
+        for i, feature in enumerate(features):
+            psi_score = float(psi_scores[i])
+            ks_statistic = float(ks_statistics[i])
+            ks_p_value = float(ks_p_values[i])
             
             # Determine status
             psi_drifted = psi_score >= self.psi_threshold
@@ -189,22 +373,8 @@ class DriftDetector:
             else:
                 severity = "none"
             
-            # Calculate statistics
-            baseline_stats = {
-                'mean': float(np.nanmean(baseline_values)),
-                'std': float(np.nanstd(baseline_values)),
-                'min': float(np.nanmin(baseline_values)),
-                'max': float(np.nanmax(baseline_values)),
-                'median': float(np.nanmedian(baseline_values))
-            }
-            
-            current_stats = {
-                'mean': float(np.nanmean(current_values)),
-                'std': float(np.nanstd(current_values)),
-                'min': float(np.nanmin(current_values)),
-                'max': float(np.nanmax(current_values)),
-                'median': float(np.nanmedian(current_values))
-            }
+            baseline_stats = baseline_profile['stats'][rows[i]]
+            current_stats = current_stats_list[i]
             
             # Calculate distribution shift
             mean_change_pct = (
@@ -237,6 +407,74 @@ class DriftDetector:
         
         return drift_reports
     
+    @staticmethod
+    def _ks_p_values(
+        statistics: np.ndarray,
+        n_baseline: np.ndarray,
+        n_current: np.ndarray
+    ) -> np.ndarray:
+        """Asymptotic two-sided KS p-values (as in ks_2samp(method='asymp'))"""
+        p_values = np.ones(len(statistics))
+        valid = (n_baseline > 0) & (n_current > 0)
+        if valid.any():
+            en = n_baseline[valid] * n_current[valid] / (n_baseline[valid] + n_current[valid])
+            p_values[valid] = stats.kstwo.sf(statistics[valid], np.maximum(np.round(en), 1))
+        return np.clip(p_values, 0.0, 1.0)
+    
+    @staticmethod
+    def _n_valid_sorted(values_sorted: np.ndarray) -> Union[int, np.ndarray]:
+        """
+        Number of non-NaN values in a sorted array, or per row of a
+        row-sorted matrix
+        
+        NaN sorts last, so a binary search finds the count without
+        building a mask over the whole array.
+        """
+        if values_sorted.dtype.kind != 'f':
+            if values_sorted.ndim == 1:
+                return len(values_sorted)
+            return np.full(values_sorted.shape[0], values_sorted.shape[1], dtype=np.int64)
+        if values_sorted.ndim == 1:
+            return int(np.searchsorted(values_sorted, np.nan))
+        return np.array([np.searchsorted(row, np.nan) for row in values_sorted], dtype=np.int64)
+    
+    @staticmethod
+    def _summary_stats(values_sorted: np.ndarray, n_valid: np.ndarray) -> List[Dict]:
+        """
+        Mean/std/min/max/median for each row of a row-sorted, NaN-padded matrix
+        
+        Min, max and median are read off the sorted rows; only mean and std
+        need a reduction pass, and that skips the NaN handling when no row
+        has padding.
+        """
+        rows = np.arange(values_sorted.shape[0])
+        last = np.maximum(n_valid - 1, 0)
+        
+        if values_sorted.shape[1] > 0 and (n_valid == values_sorted.shape[1]).all():
+            means = values_sorted.mean(axis=1)
+            stds = values_sorted.std(axis=1)
+        else:
+            with warnings.catch_warnings():
+                # All-NaN features yield NaN stats, as per-column nan reductions did
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                means = np.nanmean(values_sorted, axis=1)
+                stds = np.nanstd(values_sorted, axis=1)
+        
+        mins = values_sorted[:, 0]
+        maxs = values_sorted[rows, last]
+        medians = 0.5 * (values_sorted[rows, last // 2] + values_sorted[rows, n_valid // 2])
+        
+        return [
+            {
+                'mean': float(means[i]),
+                'std': float(stds[i]),
+                'min': float(mins[i]),
+                'max': float(maxs[i]),
+                'median': float(medians[i])
+            }
+            for i in rows
+        ]
+    
     def detect_prediction_drift(
         self,
         baseline_predictions: np.ndarray,
@@ -248,7 +486,7 @@ class DriftDetector:
         Args:
             baseline_predictions: Baseline predictions
             current_predictions: Current predictions
-            
+        
         Returns:
             Prediction drift report
         """
@@ -280,7 +518,7 @@ class DriftDetector:
         
         Args:
             drift_reports: List of feature drift reports
-            
+        
         Returns:
             Recommendation string
         """
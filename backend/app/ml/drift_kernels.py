@@ -0,0 +1,278 @@
+"""Compiled kernels for PSI and KS drift statistics"""
+
+import os
+
+import numpy as np
+
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+    
+    # Kernels run off the main thread (threadpool, test client); the
+    # workqueue and TBB layers can hang at interpreter exit there
+    if "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+except ImportError:  # pragma: no cover - numba is optional
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """Fallback decorator that leaves the function as plain Python/NumPy"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Added to bin proportions to avoid log(0)
+PSI_EPSILON = 1e-10
+
+
+@njit(cache=True, fastmath=True)
+def psi_from_counts(baseline_counts, current_counts):
+    """
+    Calculate PSI from two histograms over the same bin edges
+    
+    Args:
+        baseline_counts: Baseline bin counts
+        current_counts: Current bin counts
+    
+    Returns:
+        PSI score
+    """
+    n_baseline = baseline_counts.sum()
+    n_current = current_counts.sum()
+    if n_baseline == 0 or n_current == 0:
+        return 0.0
+    
+    psi = 0.0
+    for i in range(baseline_counts.shape[0]):
+        b = baseline_counts[i] / n_baseline + PSI_EPSILON
+        c = current_counts[i] / n_current + PSI_EPSILON
+        psi += (c - b) * np.log(c / b)
+    return psi
+
+
+@njit(cache=True)
+def psi_from_samples(baseline, current, n_bins):
+    """
+    PSI of two raw samples in one fused pass per array
+    
+    NaNs are skipped; bins split the joint min/max range into equal widths.
+    
+    Args:
+        baseline: Baseline values
+        current: Current values
+        n_bins: Number of bins
+    
+    Returns:
+        (psi, n_valid_baseline, n_valid_current)
+    """
+    lo = np.inf
+    hi = -np.inf
+    n_baseline = 0
+    n_current = 0
+    for x in baseline:
+        if not np.isnan(x):
+            n_baseline += 1
+            lo = min(lo, x)
+            hi = max(hi, x)
+    for x in current:
+        if not np.isnan(x):
+            n_current += 1
+            lo = min(lo, x)
+            hi = max(hi, x)
+    
+    if n_baseline == 0 or n_current == 0 or lo == hi:
+        return 0.0, n_baseline, n_current
+    
+    scale = n_bins / (hi - lo)
+    baseline_counts = np.zeros(n_bins, dtype=np.int64)
+    current_counts = np.zeros(n_bins, dtype=np.int64)
+    for x in baseline:
+        if not np.isnan(x):
+            baseline_counts[min(int((x - lo) * scale), n_bins - 1)] += 1
+    for x in current:
+        if not np.isnan(x):
+            current_counts[min(int((x - lo) * scale), n_bins - 1)] += 1
+    
+    return psi_from_counts(baseline_counts, current_counts), n_baseline, n_current
+
+
+@njit(cache=True)
+def counts_from_sorted(values_sorted, edges):
+    """
+    Histogram a sorted array, matching np.histogram bin semantics
+    
+    Args:
+        values_sorted: Sorted values (no NaN)
+        edges: Bin edges; the outer edges may be -inf/inf
+    
+    Returns:
+        Bin counts
+    """
+    n_bins = edges.shape[0] - 1
+    counts = np.zeros(n_bins, dtype=np.int64)
+    lower = 0
+    for i in range(n_bins - 1):
+        upper = np.searchsorted(values_sorted, edges[i + 1], side='left')
+        counts[i] = upper - lower
+        lower = upper
+    counts[n_bins - 1] = values_sorted.shape[0] - lower
+    return counts
+
+
+@njit(cache=True)
+def counts_from_values(values, edges):
+    """
+    Histogram unsorted values against fixed bin edges in one pass
+    
+    NaNs are skipped; otherwise matches np.histogram bin semantics. Counts
+    from consecutive windows can be summed to histogram a stream.
+    
+    Args:
+        values: Values to bin
+        edges: Bin edges; the outer edges may be -inf/inf
+    
+    Returns:
+        Bin counts
+    """
+    inner = edges[1:-1]
+    counts = np.zeros(edges.shape[0] - 1, dtype=np.int64)
+    for x in values:
+        if not np.isnan(x):
+            counts[np.searchsorted(inner, x, side='right')] += 1
+    return counts
+
+
+@njit(cache=True, parallel=True)
+def counts_batch(values_sorted, n_valid, edges):
+    """
+    Histogram every row of a NaN-padded, row-sorted matrix
+    
+    Args:
+        values_sorted: (n_features, n) sorted values, NaN after n_valid
+        n_valid: Valid values per row
+        edges: (n_features, n_bins + 1) bin edges per row
+    
+    Returns:
+        (n_features, n_bins) bin counts
+    """
+    n_features = values_sorted.shape[0]
+    counts = np.zeros((n_features, edges.shape[1] - 1), dtype=np.int64)
+    for f in prange(n_features):
+        counts[f] = counts_from_sorted(values_sorted[f, :n_valid[f]], edges[f])
+    return counts
+
+
+@njit(cache=True)
+def ks_statistic_sorted(baseline_sorted, current_sorted):
+    """
+    Two-sample KS statistic over pre-sorted arrays
+    
+    Args:
+        baseline_sorted: Sorted baseline values (no NaN)
+        current_sorted: Sorted current values (no NaN)
+    
+    Returns:
+        Maximum distance between the two empirical CDFs
+    """
+    n = baseline_sorted.shape[0]
+    m = current_sorted.shape[0]
+    if n == 0 or m == 0:
+        return 0.0
+    
+    # Two-pointer merge: step past every copy of the next smallest value in
+    # both arrays, then compare the empirical CDFs there. Once one array is
+    # exhausted the gap only shrinks, so the loop can stop.
+    inv_n = 1.0 / n
+    inv_m = 1.0 / m
+    i = 0
+    j = 0
+    d = 0.0
+    while i < n and j < m:
+        x = min(baseline_sorted[i], current_sorted[j])
+        while i < n and baseline_sorted[i] == x:
+            i += 1
+        while j < m and current_sorted[j] == x:
+            j += 1
+        d = max(d, abs(i * inv_n - j * inv_m))
+    return d
+
+
+@njit(cache=True, parallel=True)
+def drift_batch(baseline_sorted, baseline_n, baseline_counts, edges, current):
+    """
+    PSI and KS statistics for every feature at once
+    
+    Baseline rows hold one feature each, sorted ascending with NaN padding
+    after the first `n` valid values. Current rows are sorted in place
+    (NaN last) inside the parallel loop, so each thread sorts and merges
+    its own features.
+    
+    Args:
+        baseline_sorted: (n_features, n_baseline) sorted baseline values
+        baseline_n: Valid baseline values per feature
+        baseline_counts: (n_features, n_bins) cached baseline histograms
+        edges: (n_features, n_bins + 1) cached bin edges
+        current: (n_features, n_current) C-contiguous current values;
+            sorted in place
+    
+    Returns:
+        (psi_scores, ks_statistics, current_n)
+    """
+    n_features = baseline_sorted.shape[0]
+    psi = np.zeros(n_features)
+    ks = np.zeros(n_features)
+    current_n = np.zeros(n_features, dtype=np.int64)
+    for f in prange(n_features):
+        row = current[f]
+        row.sort()
+        n = row.shape[0]
+        while n > 0 and np.isnan(row[n - 1]):
+            n -= 1
+        current_n[f] = n
+        
+        valid = row[:n]
+        current_counts = counts_from_sorted(valid, edges[f])
+        psi[f] = psi_from_counts(baseline_counts[f], current_counts)
+        ks[f] = ks_statistic_sorted(baseline_sorted[f, :baseline_n[f]], valid)
+    return psi, ks, current_n
+
+
+if not NUMBA_AVAILABLE:  # pragma: no cover - exercised without numba
+    def drift_batch(baseline_sorted, baseline_n, baseline_counts, edges, current):
+        """
+        Vectorized NumPy version of drift_batch (same arguments and results)
+        
+        Without numba the kernel above would run as interpreted loops over
+        every value, so each feature is handled with sort/searchsorted
+        instead.
+        """
+        n_features = baseline_sorted.shape[0]
+        psi = np.zeros(n_features)
+        ks = np.zeros(n_features)
+        current_n = np.zeros(n_features, dtype=np.int64)
+        current.sort(axis=1)
+        for f in range(n_features):
+            n = int(np.searchsorted(current[f], np.nan))
+            current_n[f] = n
+            valid = current[f, :n]
+            baseline = baseline_sorted[f, :baseline_n[f]]
+            
+            # Counts per bin, as counts_from_sorted
+            bounds = np.searchsorted(valid, edges[f, 1:-1], side='left')
+            current_counts = np.diff(bounds, prepend=0, append=n)
+            
+            n_baseline = baseline_counts[f].sum()
+            if n_baseline > 0 and n > 0:
+                b = baseline_counts[f] / n_baseline + PSI_EPSILON
+                c = current_counts / n + PSI_EPSILON
+                psi[f] = (c - b) @ np.log(c / b)
+            
+            # Largest ECDF gap, checked at every observed value
+            if baseline.shape[0] > 0 and n > 0:
+                points = np.concatenate((baseline, valid))
+                cdf_b = np.searchsorted(baseline, points, side='right') / baseline.shape[0]
+                cdf_c = np.searchsorted(valid, points, side='right') / n
+                ks[f] = np.abs(cdf_b - cdf_c).max()
+        return psi, ks, current_n
@@ -1,15 +1,25 @@
 """ML Model Wrapper for Production Inference"""
 
+import json
 import joblib
 import numpy as np
-import pandas as pd
+import xgboost as xgb
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import logging
+import operator
+import threading
 import time
 
 from app.config import settings
 
+try:
+    import tl2cgen
+    TREELITE_AVAILABLE = True
+except ImportError:  # pragma: no cover - treelite is optional
+    TREELITE_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,45 +41,86 @@ class MLModel:
         self.feature_names = None
         self.training_date = None
         self.is_loaded = False
-        
+        self._booster = None
+        self._predictor = None
+        self._local = threading.local()
+    
     def load(self):
         """Load model from disk"""
         try:
-            model_file = Path(self.model_path) / f"model_{self.version}.joblib"
-            metadata_file = Path(self.model_path) / f"metadata_{self.version}.joblib"
-            
-            if not model_file.exists():
-                raise FileNotFoundError(f"Model file not found: {model_file}")
+            model_file = Path(self.model_path) / f"model_{self.version}.ubj"
+            metadata_file = Path(self.model_path) / f"metadata_{self.version}.json"
             
-            # Load model
-            self.model = joblib.load(model_file)
-            self.metadata = joblib.load(metadata_file)
+            if model_file.exists():
+                # Native XGBoost format: no unpickling, and scoring goes
+                # through the booster directly rather than the sklearn wrapper
+                self._booster = xgb.Booster()
+                self._booster.load_model(str(model_file))
+                self.model = self._booster
+                with open(metadata_file) as f:
+                    self.metadata = json.load(f)
+                self.metadata['training_date'] = datetime.fromisoformat(self.metadata['training_date'])
+            else:
+                # Deprecated: pickled XGBClassifier from older releases
+                model_file = Path(self.model_path) / f"model_{self.version}.joblib"
+                metadata_file = Path(self.model_path) / f"metadata_{self.version}.joblib"
+                
+                if not model_file.exists():
+                    raise FileNotFoundError(f"Model file not found: {model_file}")
+                
+                logger.warning(f"Loading pickled model {model_file}; retrain to save it in native format")
+                self.model = joblib.load(model_file)
+                self.metadata = joblib.load(metadata_file)
+                self._booster = self.model.get_booster()
             
             # Extract metadata
             self.feature_names = self.metadata['feature_names']
             self.training_date = self.metadata['training_date']
+            self._feature_names_set = frozenset(self.feature_names)
+            self._get_features = operator.itemgetter(*self.feature_names)
+            self._n = len(self.feature_names)
+            
+            # Prefer the Treelite-compiled forest when it was built from
+            # this model (a stale library would score an older forest)
+            lib_file = Path(self.model_path) / f"model_{self.version}.so"
+            self._predictor = None
+            if (
+                TREELITE_AVAILABLE
+                and lib_file.exists()
+                and lib_file.stat().st_mtime >= model_file.stat().st_mtime
+            ):
+                try:
+                    self._predictor = tl2cgen.Predictor(str(lib_file))
+                    logger.info(f"Using compiled model: {lib_file}")
+                except Exception as e:
+                    logger.warning(f"Could not load compiled model, using XGBoost: {e}")
+            
+            # Importances are computed from the trees, so cache them once
+            # for the contribution proxy
+            self._importances = self._gain_importances()
             self.is_loaded = True
             
             logger.info(f"Model loaded successfully: {self.version}")
             logger.info(f"Training date: {self.training_date}")
             logger.info(f"Features: {len(self.feature_names)}")
-            
+        
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
     
     def predict(
         self,
-        features: Dict[str, float],
+        features: Union[Dict[str, float], np.ndarray],
         compute_contributions: bool = True
     ) -> Tuple[int, float, Optional[Dict[str, float]]]:
         """
         Make prediction
         
         Args:
-            features: Feature dictionary
+            features: Feature dictionary, or a (1, n_features) float32 array
+                already in feature_names order
             compute_contributions: Whether to compute feature contributions
-            
+        
         Returns:
             (prediction, probability, feature_contributions)
         """
@@ -79,12 +130,15 @@ class MLModel:
         start_time = time.time()
         
         try:
-            # Convert to DataFrame
-            X = self._prepare_features(features)
+            # Build the input vector (prebuilt vectors go to XGBoost as-is)
+            if isinstance(features, np.ndarray):
+                X = features
+            else:
+                X = self._prepare_features(features)
             
-            # Make prediction
-            prediction = int(self.model.predict(X)[0])
-            probability = float(self.model.predict_proba(X)[0, 1])
+            # Make prediction (one forest pass; same 0.5 cut as predict())
+            probability = float(self._predict_proba(X)[0])
+            prediction = int(probability > 0.5)
             
             # Calculate feature contributions (simplified SHAP-like)
             feature_contributions = None
@@ -94,21 +148,22 @@ class MLModel:
             latency = (time.time() - start_time) * 1000  # ms
             
             return prediction, probability, feature_contributions, latency
-            
+        
         except Exception as e:
             logger.error(f"Error making prediction: {e}")
             raise
     
     def predict_batch(
         self,
-        features_list: list
+        features_list: Union[list, np.ndarray]
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Make batch predictions (faster for multiple samples)
         
         Args:
-            features_list: List of feature dictionaries
-            
+            features_list: List of feature dictionaries, or an
+                (n, n_features) array already in feature_names order
+        
         Returns:
             (predictions, probabilities)
         """
@@ -116,41 +171,116 @@ class MLModel:
             self.load()
         
         try:
-            # Convert to DataFrame
-            X = pd.DataFrame(features_list)
-            X = X[self.feature_names]  # Ensure correct order
+            if isinstance(features_list, np.ndarray):
+                # Columnar callers skip the per-value Python fill entirely
+                X = np.ascontiguousarray(features_list, dtype=np.float32)
+            else:
+                # Build the (n, n_features) input row by row in feature order
+                names = self.feature_names
+                X = np.fromiter(
+                    (row[name] for row in features_list for name in names),
+                    dtype=np.float32,
+                    count=len(features_list) * self._n
+                ).reshape(len(features_list), self._n)
             
             # Make predictions
-            predictions = self.model.predict(X)
-            probabilities = self.model.predict_proba(X)[:, 1]
+            probabilities = self._predict_proba(X)
+            predictions = (probabilities > 0.5).astype(np.int64)
             
             return predictions, probabilities
-            
+        
         except Exception as e:
             logger.error(f"Error in batch prediction: {e}")
             raise
     
-    def _prepare_features(self, features: Dict[str, float]) -> pd.DataFrame:
+    def predict_rows(
+        self,
+        X: np.ndarray,
+        compute_contributions: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[List[Dict[str, float]]]]:
+        """
+        Predict a stack of single-request rows in one forest pass
+        
+        Args:
+            X: (n, n_features) float32 array in feature_names order
+            compute_contributions: Whether to compute feature contributions
+        
+        Returns:
+            (predictions, probabilities, per-row feature contributions)
+        """
+        if not self.is_loaded:
+            self.load()
+        
+        probabilities = self._predict_proba(X)
+        predictions = (probabilities > 0.5).astype(np.int64)
+        
+        # Same proxy as _get_feature_contributions, for all rows at once
+        contributions = None
+        if compute_contributions:
+            values = np.round(self._importances * X * 0.01, 4)
+            names = self.feature_names
+            contributions = [dict(zip(names, row)) for row in values.tolist()]
+        
+        return predictions, probabilities, contributions
+    
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Fraud probability for each row of a float32 feature matrix
+        
+        Args:
+            X: (n, n_features) array in feature_names order
+        
+        Returns:
+            (n,) array of probabilities
+        """
+        if self._predictor is not None:
+            return self._predictor.predict(tl2cgen.DMatrix(X)).reshape(-1)
+        return self._booster.inplace_predict(X)
+    
+    def _prepare_features(self, features: Dict[str, float]) -> np.ndarray:
         """
         Prepare features for prediction
         
         Args:
             features: Feature dictionary
-            
+        
         Returns:
-            DataFrame with correct feature order
+            (1, n_features) float32 array in feature_names order, reused
+            by the next call on the same thread
         """
-        # Check for missing features
-        missing = set(self.feature_names) - set(features.keys())
-        if missing:
+        # Pull values in feature order; a KeyError means a feature is missing
+        try:
+            values = self._get_features(features)
+        except KeyError:
+            missing = set(self._feature_names_set.difference(features))
             raise ValueError(f"Missing features: {missing}")
         
-        # Create DataFrame with correct feature order
-        X = pd.DataFrame([features])[self.feature_names]
+        # Fill a per-thread scratch row in place; XGBoost works in float32
+        X = getattr(self._local, 'scratch', None)
+        if X is None or X.shape[1] != self._n:
+            X = self._local.scratch = np.empty((1, self._n), dtype=np.float32)
+        X[0] = values
         
         return X
     
-    def _get_feature_contributions(self, X: pd.DataFrame) -> Dict[str, float]:
+    def _gain_importances(self) -> np.ndarray:
+        """
+        Normalized gain importance per feature, as XGBClassifier's
+        feature_importances_ reports it
+        
+        Returns:
+            Importances in feature_names order (uniform if the trees have
+            no splits)
+        """
+        scores = self._booster.get_score(importance_type='gain')
+        importances = np.array([scores.get(name, 0.0) for name in self.feature_names])
+        total = importances.sum()
+        if total <= 0:
+            # Fallback to uniform importance
+            return np.full(self._n, 1.0 / self._n)
+        return importances / total
+    
+    def _get_feature_contributions(self, X: np.ndarray) -> Dict[str, float]:
         """
         Calculate feature contributions (simplified version)
         
@@ -158,32 +288,24 @@ class MLModel:
         This is faster than true SHAP and good enough for monitoring
         
         Args:
-            X: Feature DataFrame (single row)
-            
+            X: Feature array (single row)
+        
         Returns:
             Dictionary of feature contributions
         """
         try:
-            # Get feature importances
-            if hasattr(self.model, 'feature_importances_'):
-                importances = self.model.feature_importances_
-            else:
-                # Fallback to uniform importance
-                importances = np.ones(len(self.feature_names)) / len(self.feature_names)
-            
-            # Get feature values
-            feature_values = X.iloc[0].values
-            
             # Simple contribution: importance * normalized_value
             # This is a proxy for SHAP values (much faster to compute)
-            contributions = {}
-            for i, feature in enumerate(self.feature_names):
-                # Normalize by importance
-                contribution = float(importances[i] * feature_values[i] / 100)  # Scale down
-                contributions[feature] = round(contribution, 4)
-            
-            return contributions
+            # Computed in a per-thread scratch vector; only the dict is new
+            contributions = getattr(self._local, 'contributions', None)
+            if contributions is None or contributions.shape[0] != self._n:
+                contributions = self._local.contributions = np.empty(self._n)
+            np.multiply(self._importances, X[0], out=contributions)
+            contributions *= 0.01  # Scale down
+            np.round(contributions, 4, out=contributions)
             
+            return dict(zip(self.feature_names, contributions.tolist()))
+        
         except Exception as e:
             logger.error(f"Error calculating feature contributions: {e}")
             return {}
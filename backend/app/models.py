@@ -1,12 +1,11 @@
 """SQLAlchemy Database Models"""
 
 from sqlalchemy import (
-    Column, String, Integer, Float, Boolean, Text,
-    DateTime, ForeignKey, Index
+    Column, Computed, String, Integer, Float, Boolean, Text,
+    DateTime, ForeignKeyConstraint, Index, DDL, UniqueConstraint, event, false, literal_column, text
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.sql import func
-import uuid
+from sqlalchemy.dialects.postgresql import UUID, JSONB, REAL
+from sqlalchemy.sql import column, func, table
 
 from app.database import Base
 
@@ -16,53 +15,112 @@ class ModelRegistry(Base):
     
     __tablename__ = "model_registry"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     version = Column(String(50), unique=True, nullable=False, index=True)
     model_type = Column(String(50), nullable=False)
     training_date = Column(DateTime, nullable=False)
     training_samples = Column(Integer, nullable=False)
     feature_count = Column(Integer, nullable=False)
     metrics = Column(JSONB)
-    status = Column(String(20), default="active", index=True)
-    created_at = Column(DateTime, default=func.now())
+    status = Column(String(20), server_default="active", index=True)
+    created_at = Column(DateTime, server_default=func.now())
 
 
 class Prediction(Base):
     """Predictions made by the model"""
     
     __tablename__ = "predictions"
+    __table_args__ = (
+        # The partition key has to be part of every unique constraint, so a
+        # transaction_id is unique per prediction_timestamp
+        UniqueConstraint('transaction_id', 'prediction_timestamp'),
+        {'postgresql_partition_by': 'RANGE (prediction_timestamp)'}
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    transaction_id = Column(String(100), unique=True, nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    transaction_id = Column(String(100), nullable=False)
     model_version = Column(String(50), nullable=False, index=True)
-    features = Column(JSONB, nullable=False)
+    features = Column(JSONB(none_as_null=True), nullable=False)
     prediction = Column(Integer, nullable=False)
     prediction_proba = Column(Float, nullable=False)
-    feature_contributions = Column(JSONB)
-    prediction_timestamp = Column(DateTime, nullable=False, index=True)
-    latency_ms = Column(Float)
-    created_at = Column(DateTime, default=func.now())
+    # none_as_null: None is SQL NULL (as written by COPY), not JSON 'null'
+    feature_contributions = Column(JSONB(none_as_null=True))
+    prediction_timestamp = Column(DateTime, primary_key=True, index=True)
+    latency_ms = Column(REAL)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    # Most queried features, extracted once on write (see GENERATED_FEATURES)
+    amount = Column(Float, Computed("(features->>'amount')::float8", persisted=True))
+    hour_of_day = Column(Integer, Computed("(features->>'hour_of_day')::numeric::int", persisted=True))
+    merchant_risk_score = Column(Float, Computed("(features->>'merchant_risk_score')::float8", persisted=True))
+
+
+# Features stored as generated columns on predictions; filters and drift
+# queries read these without parsing the JSONB
+GENERATED_FEATURES = frozenset(('amount', 'hour_of_day', 'merchant_risk_score'))
 
+# Composite index for time-window queries on one model version
+# (equality column first, then the range/sort column)
+Index('idx_predictions_model_time',
+      Prediction.model_version,
+      Prediction.prediction_timestamp.desc())
 
-# Create composite index for time-based queries
-Index('idx_predictions_time_model', 
-      Prediction.prediction_timestamp.desc(), 
-      Prediction.model_version)
+# Time-bounded joins to ground_truth; prediction is included so the
+# recent-accuracy query reads predictions with an index-only scan
+Index('idx_predictions_time_txn',
+      Prediction.prediction_timestamp,
+      Prediction.transaction_id,
+      postgresql_include=['prediction'])
+
+
+def feature_value(name: str, type_=Float):
+    """
+    SQL expression for one feature
+    
+    The generated column for GENERATED_FEATURES, else
+    (features->>'name')::type.
+    """
+    if name in GENERATED_FEATURES:
+        return getattr(Prediction, name)
+    return Prediction.features[literal_column(f"'{name}'")].astext.cast(type_)
+
+
+# Range filters on the most queried numeric features
+Index('idx_predictions_amount', Prediction.amount)
+Index('idx_predictions_hour', Prediction.hour_of_day)
+Index('idx_predictions_merchant_risk', Prediction.merchant_risk_score)
 
 
 class GroundTruth(Base):
     """Ground truth labels (delayed feedback)"""
     
     __tablename__ = "ground_truth"
+    __table_args__ = (
+        # A transaction_id is only unique per prediction_timestamp, so a
+        # label references the exact prediction it was given for (the
+        # latest one when it was submitted)
+        ForeignKeyConstraint(
+            ['transaction_id', 'prediction_timestamp'],
+            ['predictions.transaction_id', 'predictions.prediction_timestamp']
+        ),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    transaction_id = Column(String(100), ForeignKey('predictions.transaction_id'), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    transaction_id = Column(String(100), nullable=False)
+    prediction_timestamp = Column(DateTime, nullable=False)
     actual_label = Column(Integer, nullable=False)
     label_source = Column(String(50))
     feedback_timestamp = Column(DateTime, nullable=False, index=True)
     confidence = Column(String(20))
     notes = Column(Text)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# Joins to the labelled prediction (and the foreign key checks on
+# partition removal)
+Index('idx_ground_truth_transaction',
+      GroundTruth.transaction_id,
+      GroundTruth.prediction_timestamp)
 
 
 class FeatureStatistics(Base):
@@ -70,35 +128,40 @@ class FeatureStatistics(Base):
     
     __tablename__ = "feature_statistics"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     feature_name = Column(String(100), nullable=False, index=True)
     model_version = Column(String(50), nullable=False)
     statistics_type = Column(String(20), nullable=False, index=True)  # 'baseline' or 'current'
     time_window_start = Column(DateTime, index=True)
     time_window_end = Column(DateTime, index=True)
-    mean = Column(Float)
-    std = Column(Float)
-    min = Column(Float)
-    max = Column(Float)
-    percentile_25 = Column(Float)
-    percentile_50 = Column(Float)
-    percentile_75 = Column(Float)
+    mean = Column(REAL)
+    std = Column(REAL)
+    min = Column(REAL)
+    max = Column(REAL)
+    percentile_25 = Column(REAL)
+    percentile_50 = Column(REAL)
+    percentile_75 = Column(REAL)
     distribution = Column(JSONB)  # Histogram
     sample_count = Column(Integer)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, server_default=func.now())
 
 
 Index('idx_feature_stats_window', 
       FeatureStatistics.time_window_start, 
       FeatureStatistics.time_window_end)
 
+Index('idx_feature_stats_distribution_gin',
+      FeatureStatistics.distribution,
+      postgresql_using='gin',
+      postgresql_ops={'distribution': 'jsonb_path_ops'})
+
 
 class DriftReport(Base):
     """Drift detection reports"""
     
     __tablename__ = "drift_reports"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     report_timestamp = Column(DateTime, nullable=False, index=True)
     model_version = Column(String(50), nullable=False)
     time_window_start = Column(DateTime, nullable=False)
@@ -111,7 +174,13 @@ class DriftReport(Base):
     feature_drift_details = Column(JSONB)
     prediction_drift = Column(JSONB)
     performance_metrics = Column(JSONB)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, server_default=func.now())
+
+
+Index('idx_drift_reports_details_gin',
+      DriftReport.feature_drift_details,
+      postgresql_using='gin',
+      postgresql_ops={'feature_drift_details': 'jsonb_path_ops'})
 
 
 class Alert(Base):
@@ -119,7 +188,7 @@ class Alert(Base):
     
     __tablename__ = "alerts"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     alert_type = Column(String(50), nullable=False)
     severity = Column(String(20), nullable=False, index=True)
     title = Column(String(200), nullable=False)
@@ -129,53 +198,182 @@ class Alert(Base):
     threshold_value = Column(Float)
     recommendation = Column(Text)
     triggered_at = Column(DateTime, nullable=False, index=True)
-    acknowledged = Column(Boolean, default=False, index=True)
+    acknowledged = Column(Boolean, server_default=false(), index=True)
     acknowledged_at = Column(DateTime)
-    resolved = Column(Boolean, default=False, index=True)
+    resolved = Column(Boolean, server_default=false(), index=True)
     resolved_at = Column(DateTime)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, server_default=func.now())
 
 
 Index('idx_alerts_status', Alert.acknowledged, Alert.resolved)
 
+# Open alerts by severity, newest first
+Index('idx_alerts_open_severity_time',
+      Alert.resolved,
+      Alert.severity,
+      Alert.triggered_at.desc())
+
 
 class MetricsHistory(Base):
     """Time series metrics"""
     
     __tablename__ = "metrics_history"
+    __table_args__ = {'postgresql_partition_by': 'RANGE (timestamp)'}
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime, nullable=False, index=True)
+    # The partition key has to be part of the primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    timestamp = Column(DateTime, primary_key=True, index=True)
     model_version = Column(String(50), nullable=False, index=True)
     predictions_count = Column(Integer, nullable=False)
     labels_received = Column(Integer)
-    accuracy = Column(Float)
-    precision_score = Column(Float)
-    recall_score = Column(Float)
-    f1_score = Column(Float)
-    auc_roc = Column(Float)
-    avg_psi = Column(Float)
-    max_psi = Column(Float)
-    avg_ks_statistic = Column(Float)
-    drift_alerts_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=func.now())
+    accuracy = Column(REAL)
+    precision_score = Column(REAL)
+    recall_score = Column(REAL)
+    f1_score = Column(REAL)
+    auc_roc = Column(REAL)
+    avg_psi = Column(REAL)
+    max_psi = Column(REAL)
+    avg_ks_statistic = Column(REAL)
+    drift_alerts_count = Column(Integer, server_default="0")
+    created_at = Column(DateTime, server_default=func.now())
+
+
+Index('idx_metrics_history_model_time',
+      MetricsHistory.model_version,
+      MetricsHistory.timestamp.desc())
+
+
+# Hourly prediction/label metrics, precomputed so dashboard polls don't
+# rescan predictions x ground_truth. The monitoring worker refreshes it
+# CONCURRENTLY (hence the unique index) and records when in
+# view_refreshes. Every refresh still recomputes the whole view, a scan of
+# the retained predictions, but only rewrites the buckets that changed
+# (normally the current hour), so the view carries no per-refresh column.
+METRICS_HOURLY_DDL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS metrics_hourly AS
+SELECT
+    date_trunc('hour', p.prediction_timestamp) AS ts,
+    p.model_version,
+    count(*) AS predictions_count,
+    count(g.actual_label) AS labels_received,
+    avg((p.prediction = g.actual_label)::int)::float AS accuracy,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label IS NOT NULL), 0) AS precision_score,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE g.actual_label = 1), 0) AS recall_score,
+    avg(p.prediction_proba)::float AS avg_proba
+FROM predictions p
+LEFT JOIN ground_truth g
+    ON g.transaction_id = p.transaction_id AND g.prediction_timestamp = p.prediction_timestamp
+GROUP BY 1, 2
+"""
+
+# Separate statements: asyncpg can't prepare more than one at a time
+event.listen(Base.metadata, 'after_create', DDL(METRICS_HOURLY_DDL))
+event.listen(Base.metadata, 'after_create', DDL(
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_hourly_ts_model "
+    "ON metrics_hourly (ts, model_version)"
+))
+
+# Query handle for the view (not part of the metadata, so create_all
+# never mistakes it for a table)
+metrics_hourly = table(
+    'metrics_hourly',
+    column('ts', DateTime),
+    column('model_version', String),
+    column('predictions_count', Integer),
+    column('labels_received', Integer),
+    column('accuracy', Float),
+    column('precision_score', Float),
+    column('recall_score', Float),
+    column('avg_proba', Float)
+)
+
+
+class ViewRefresh(Base):
+    """Last refresh time of each materialized view"""
+    
+    __tablename__ = "view_refreshes"
+    
+    view_name = Column(String(100), primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
 
 
 class SystemHealth(Base):
     """System health monitoring"""
     
     __tablename__ = "system_health"
+    __table_args__ = {'postgresql_partition_by': 'RANGE (timestamp)'}
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp = Column(DateTime, nullable=False, index=True)
+    # The partition key has to be part of the primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    timestamp = Column(DateTime, primary_key=True, index=True)
     component = Column(String(50), nullable=False, index=True)
     status = Column(String(20), nullable=False)
-    cpu_usage = Column(Float)
-    memory_usage = Column(Float)
-    request_rate = Column(Float)
-    error_rate = Column(Float)
-    latency_p50 = Column(Float)
-    latency_p95 = Column(Float)
-    latency_p99 = Column(Float)
-    created_at = Column(DateTime, default=func.now())
+    cpu_usage = Column(REAL)
+    memory_usage = Column(REAL)
+    request_rate = Column(REAL)
+    error_rate = Column(REAL)
+    latency_p50 = Column(REAL)
+    latency_p95 = Column(REAL)
+    latency_p99 = Column(REAL)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# Latest-status-per-component lookups
+Index('idx_system_health_component_time',
+      SystemHealth.component,
+      SystemHealth.timestamp.desc())
+
+
+# Time-range partitioning for the append-only time series tables:
+# (table, partition unit, partitions created ahead). Each table gets a
+# DEFAULT partition as a catch-all; the monitoring worker calls
+# create_time_partitions daily to keep upcoming ranges in place.
+TIME_PARTITIONS = (
+    ('predictions', 'day', 7),
+    ('metrics_history', 'day', 7),
+    ('system_health', 'week', 4),
+)
+
+TIME_PARTITIONS_DDL = """
+CREATE OR REPLACE FUNCTION create_time_partitions(parent TEXT, unit TEXT, ahead INTEGER)
+RETURNS void AS $$
+DECLARE
+    step INTERVAL := ('1 ' || unit)::INTERVAL;
+    lower_bound TIMESTAMP := date_trunc(unit, NOW() AT TIME ZONE 'UTC');
+BEGIN
+    FOR i IN 0..ahead LOOP
+        BEGIN
+            EXECUTE 'CREATE TABLE IF NOT EXISTS '
+                || quote_ident(parent || '_p' || to_char(lower_bound, 'YYYYMMDD'))
+                || ' PARTITION OF ' || quote_ident(parent)
+                || ' FOR VALUES FROM (' || quote_literal(lower_bound)
+                || ') TO (' || quote_literal(lower_bound + step) || ')';
+        EXCEPTION WHEN check_violation THEN
+            -- Rows for this range already sit in the DEFAULT partition
+            RAISE WARNING 'Skipping % partition from %: DEFAULT partition has rows in range', parent, lower_bound;
+        END;
+        lower_bound := lower_bound + step;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# DDL() %-formats its statement, so escape the RAISE placeholders
+event.listen(Base.metadata, 'before_create', DDL(TIME_PARTITIONS_DDL.replace('%', '%%')))
+
+
+def _create_partitions(table_name: str, unit: str, ahead: int):
+    """Register DEFAULT + upcoming partition creation for a partitioned table"""
+    table = Base.metadata.tables[table_name]
+    event.listen(table, 'after_create', DDL(
+        f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"
+    ))
+    event.listen(table, 'after_create', DDL(
+        f"SELECT create_time_partitions('{table_name}', '{unit}', {ahead})"
+    ))
+
 
+for _table_name, _unit, _ahead in TIME_PARTITIONS:
+    _create_partitions(_table_name, _unit, _ahead)
@@ -10,20 +10,46 @@ from uuid import UUID
 # PREDICTION SCHEMAS
 # ============================================================================
 
+class TransactionFeatures(BaseModel):
+    """Model input features (fixed schema, matches the training feature set)"""
+    amount: float
+    hour_of_day: int = Field(..., ge=0, le=23)
+    day_of_week: int = Field(..., ge=0, le=6)
+    distance_from_home_km: float
+    distance_from_last_txn_km: float
+    time_since_last_txn_mins: float
+    avg_amount_last_30d: float
+    num_transactions_24h: int
+    merchant_risk_score: float
+    is_international: int = Field(..., ge=0, le=1)
+    card_present: int = Field(..., ge=0, le=1)
+    transaction_velocity: float
+    
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
+
 class PredictionRequest(BaseModel):
     """Request schema for making predictions"""
     transaction_id: str = Field(..., description="Unique transaction identifier")
-    features: Dict[str, Any] = Field(..., description="Feature dictionary")
+    features: TransactionFeatures = Field(..., description="Feature values")
     timestamp: Optional[datetime] = Field(default=None, description="Request timestamp")
     
-    model_config = ConfigDict(json_schema_extra={
+    model_config = ConfigDict(extra='forbid', frozen=True, json_schema_extra={
         "example": {
             "transaction_id": "txn_1234567890",
             "features": {
                 "amount": 127.50,
                 "hour_of_day": 14,
+                "day_of_week": 3,
                 "distance_from_home_km": 5.2,
-                "merchant_risk_score": 0.15
+                "distance_from_last_txn_km": 8.1,
+                "time_since_last_txn_mins": 45.0,
+                "avg_amount_last_30d": 120.0,
+                "num_transactions_24h": 3,
+                "merchant_risk_score": 0.15,
+                "is_international": 0,
+                "card_present": 1,
+                "transaction_velocity": 1.2
             },
             "timestamp": "2025-12-26T14:32:15Z"
         }
@@ -58,6 +84,8 @@ class FeedbackRequest(BaseModel):
     feedback_timestamp: Optional[datetime] = Field(default=None)
     confidence: Optional[str] = Field(default="high", description="Confidence in label")
     notes: Optional[str] = None
+    
+    model_config = ConfigDict(extra='forbid', frozen=True)
 
 
 class FeedbackResponse(BaseModel):
@@ -147,6 +175,8 @@ class MetricsDataPoint(BaseModel):
     avg_psi: Optional[float] = None
     max_psi: Optional[float] = None
     drift_alerts: int = 0
+    
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
 
 
 class MetricsTimeSeriesResponse(BaseModel):
@@ -154,6 +184,7 @@ class MetricsTimeSeriesResponse(BaseModel):
     interval: str
     start_time: datetime
     end_time: datetime
+    staleness_sec: Optional[float] = None  # Seconds since the view was refreshed
     data_points: List[MetricsDataPoint]
 
 
@@ -0,0 +1,148 @@
+"""Batch Predictor - Coalesce concurrent predictions into one model call"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import logging
+
+from app.config import settings
+from app.ml.model import get_model
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPredictor:
+    """
+    Micro-batch single-row predictions
+    
+    Requests queue their feature row and await a future; a background task
+    stacks whatever has queued (up to max_batch rows, waiting at most
+    max_wait after the first) and scores the stack with one model call.
+    """
+    
+    def __init__(self, max_batch: int = None, max_wait_ms: float = None):
+        """
+        Initialize predictor
+        
+        Args:
+            max_batch: Rows that trigger an immediate model call
+            max_wait_ms: Maximum milliseconds a row waits for others
+        """
+        self.max_batch = max_batch or settings.MODEL_BATCH_SIZE
+        if max_wait_ms is None:
+            max_wait_ms = settings.MODEL_BATCH_WAIT_MS
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether the background batching task is active"""
+        return self._task is not None and not self._task.done()
+    
+    async def predict(self, X: np.ndarray) -> Tuple[int, float, Optional[Dict[str, float]], float]:
+        """
+        Queue one row and wait for its batch to be scored
+        
+        Args:
+            X: (1, n_features) float32 array in the model's feature order
+        
+        Returns:
+            (prediction, probability, feature_contributions, latency_ms);
+            latency includes the time spent waiting for the batch
+        """
+        start_time = time.time()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((X, future))
+        self._ready.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        
+        prediction, probability, contributions = await future
+        latency = (time.time() - start_time) * 1000  # ms
+        
+        return prediction, probability, contributions, latency
+    
+    async def start(self):
+        """Start the background batching task"""
+        if not self.running:
+            # Bind the sync primitives to the running loop
+            self._ready = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background task and score whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            self._score_next_batch()
+    
+    async def _run(self):
+        """Score a batch once it is full, or max_wait after its first row"""
+        while True:
+            await self._ready.wait()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+            self._score_next_batch()
+    
+    def _score_next_batch(self):
+        """Score up to max_batch queued rows and resolve their futures"""
+        batch = self._pending[:self.max_batch]
+        self._pending = self._pending[self.max_batch:]
+        if not self._pending:
+            self._ready.clear()
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        if not batch:
+            return
+        
+        try:
+            predictions, probabilities, contributions = get_model().predict_rows(
+                np.concatenate([X for X, _ in batch])
+            )
+        except Exception as e:
+            logger.error(f"Error scoring batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for i, (_, future) in enumerate(batch):
+            # The request may have been cancelled while it waited
+            if not future.done():
+                future.set_result((
+                    int(predictions[i]),
+                    float(probabilities[i]),
+                    contributions[i]
+                ))
+
+
+# Global predictor instance (singleton)
+_predictor_instance = None
+
+
+def get_batch_predictor() -> BatchPredictor:
+    """
+    Get or create global batch predictor
+    
+    Returns:
+        BatchPredictor instance
+    """
+    global _predictor_instance
+    
+    if _predictor_instance is None:
+        _predictor_instance = BatchPredictor()
+    
+    return _predictor_instance
@@ -1,27 +1,110 @@
 """Monitoring Service - Calculate metrics and detect drift"""
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
 import pandas as pd
 import numpy as np
 import logging
+import xxhash
 
 from app.models import (
     Prediction, GroundTruth, DriftReport, Alert,
-    MetricsHistory, FeatureStatistics
+    MetricsHistory, FeatureStatistics, ViewRefresh, feature_value, metrics_hourly
 )
+from app.ml.data_generator import SyntheticDataGenerator
 from app.ml.drift_detector import DriftDetector
 from app.config import settings
+from app.schemas import MetricsDataPoint, TransactionFeatures
 
 logger = logging.getLogger(__name__)
 
+# Features tracked for drift, in model input order
+DRIFT_FEATURES = tuple(TransactionFeatures.model_fields)
+
+# One float column per feature, extracted from the JSONB server-side
+_FEATURE_COLUMNS = [feature_value(name).label(name) for name in DRIFT_FEATURES]
+
+# Probability buckets for the SQL-side AUC-ROC
+AUC_BUCKETS = 100
+
+# Window queries are built once and only rebound per call, so requests skip
+# statement construction and cache-key generation. Parameters: model_version,
+# start_time, end_time.
+_WINDOW = (
+    Prediction.model_version == bindparam('model_version'),
+    Prediction.prediction_timestamp >= bindparam('start_time'),
+    Prediction.prediction_timestamp <= bindparam('end_time')
+)
+
+# Rows fetched per round trip when streaming a window through a
+# server-side cursor
+STREAM_CHUNK_SIZE = 10000
+
+# Earliest predictions of a model version (an index range scan on
+# idx_predictions_model_time). Parameters: model_version, limit.
+_BASELINE_FEATURES_STMT = select(*_FEATURE_COLUMNS).where(
+    Prediction.model_version == bindparam('model_version')
+).order_by(Prediction.prediction_timestamp).limit(bindparam('limit'))
+
+# Feature columns plus the predicted probability, so one pass over the
+# window feeds both feature and prediction drift
+_CURRENT_WINDOW_STMT = select(*_FEATURE_COLUMNS, Prediction.prediction_proba).where(
+    *_WINDOW
+).execution_options(yield_per=STREAM_CHUNK_SIZE)
+
+# Confusion counts per probability bucket (highest bucket first)
+_bucket = func.width_bucket(Prediction.prediction_proba, 0.0, 1.0, AUC_BUCKETS)
+_actual_pos = GroundTruth.actual_label == 1
+_predicted_pos = Prediction.prediction == 1
+_PERFORMANCE_STMT = select(
+    _bucket,
+    func.count(),
+    func.count().filter(Prediction.prediction == GroundTruth.actual_label),
+    func.count().filter(_predicted_pos & _actual_pos),
+    func.count().filter(_predicted_pos & ~_actual_pos),
+    func.count().filter(_actual_pos)
+).join(
+    GroundTruth,
+    (Prediction.transaction_id == GroundTruth.transaction_id)
+    & (Prediction.prediction_timestamp == GroundTruth.prediction_timestamp)
+).where(*_WINDOW).group_by(_bucket).order_by(_bucket.desc())
+
+# Validates a whole timeseries in one call
+_DATA_POINTS = TypeAdapter(List[MetricsDataPoint])
+
+# View rows labelled with MetricsDataPoint's field names, plus when the
+# worker last refreshed the view
+_METRICS_HOURLY_STMT = select(
+    metrics_hourly.c.ts.label('timestamp'),
+    metrics_hourly.c.predictions_count,
+    metrics_hourly.c.labels_received,
+    metrics_hourly.c.accuracy,
+    metrics_hourly.c.precision_score.label('precision'),
+    metrics_hourly.c.recall_score.label('recall'),
+    select(ViewRefresh.refreshed_at).where(
+        ViewRefresh.view_name == 'metrics_hourly'
+    ).scalar_subquery().label('refreshed_at')
+).where(
+    metrics_hourly.c.model_version == bindparam('model_version'),
+    metrics_hourly.c.ts >= bindparam('start_time'),
+    metrics_hourly.c.ts <= bindparam('end_time')
+).order_by(metrics_hourly.c.ts)
+
 
 class MonitoringService:
     """Service for monitoring model performance and drift"""
     
-    def __init__(self, db: Session):
+    # Number of stored predictions used as the drift baseline
+    BASELINE_SIZE = 10000
+    
+    # Baseline profiles (sorted columns, histograms, stats) per model
+    # version, shared by all instances once the baseline window is complete
+    _baseline_profiles: Dict[str, Dict] = {}
+    
+    def __init__(self, db: AsyncSession):
         """Initialize monitoring service"""
         self.db = db
         self.drift_detector = DriftDetector(
@@ -38,7 +121,7 @@ class MonitoringService:
         
         Args:
             hours: Time window in hours (default: from config)
-            
+        
         Returns:
             Drift report dictionary
         """
@@ -50,35 +133,33 @@ class MonitoringService:
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(hours=hours)
             
-            # Get baseline data (from training or first week)
-            baseline_df = self._get_baseline_features()
+            # Get baseline profile (from training or first week)
+            baseline_profile = await self.get_baseline_profile()
             
             # Get current data
-            current_df = self._get_current_features(start_time, end_time)
+            current_df, current_predictions = await self._get_current_window(start_time, end_time)
             
             if len(current_df) == 0:
                 return self._empty_report(start_time, end_time)
             
             # Detect feature drift
             feature_drift_reports = self.drift_detector.detect_feature_drift(
-                baseline_df,
-                current_df
+                None,
+                current_df,
+                feature_names=list(DRIFT_FEATURES),
+                baseline_profile=baseline_profile
             )
             
             # Detect prediction drift
-            baseline_predictions = baseline_df.index.to_series().apply(lambda x: 0.02)  # Baseline fraud rate
-            current_predictions = self._get_predictions(start_time, end_time)
-            
             prediction_drift = None
             if len(current_predictions) > 0:
-                baseline_pred_array = np.full(len(current_predictions), 0.02)
                 prediction_drift = self.drift_detector.detect_prediction_drift(
-                    baseline_pred_array,
+                    np.full(len(current_predictions), settings.BASELINE_FRAUD_RATE),
                     current_predictions
                 )
             
             # Calculate performance metrics
-            performance_metrics = self._calculate_performance_metrics(start_time, end_time)
+            performance_metrics = await self._calculate_performance_metrics(start_time, end_time)
             
             # Determine overall status
             data_drift_detected = any(
@@ -125,7 +206,7 @@ class MonitoringService:
             self._store_drift_report(report)
             
             return report
-            
+        
         except Exception as e:
             logger.error(f"Error generating drift report: {e}", exc_info=True)
             raise
@@ -139,152 +220,226 @@ class MonitoringService:
         """
         Get time series metrics
         
+        Reads the hourly buckets precomputed in the metrics_hourly
+        materialized view, so the data is as fresh as its last refresh
+        (reported as staleness_sec).
+        
         Args:
             start_time: Start time
             end_time: End time
-            interval: Time interval (e.g., "1h", "15m")
-            
+            interval: Time interval (e.g., "1h", "15m"); buckets are hourly
+        
         Returns:
             Time series data
         """
         try:
-            # Query metrics history
-            metrics = self.db.query(MetricsHistory).filter(
-                MetricsHistory.timestamp >= start_time,
-                MetricsHistory.timestamp <= end_time
-            ).order_by(MetricsHistory.timestamp).all()
+            # Query the hourly metrics view
+            result = await self.db.execute(_METRICS_HOURLY_STMT, {
+                'model_version': settings.MODEL_VERSION,
+                'start_time': start_time.replace(minute=0, second=0, microsecond=0),
+                'end_time': end_time
+            })
+            metrics = result.mappings().all()
+            
+            # Unselected fields (AUC, PSI, alert counts) take schema defaults
+            data_points = _DATA_POINTS.dump_python(
+                _DATA_POINTS.validate_python(metrics), mode='json'
+            )
             
-            data_points = []
-            for metric in metrics:
-                data_points.append({
-                    'timestamp': metric.timestamp,
-                    'predictions_count': metric.predictions_count,
-                    'labels_received': metric.labels_received,
-                    'accuracy': metric.accuracy,
-                    'precision': metric.precision_score,
-                    'recall': metric.recall_score,
-                    'auc_roc': metric.auc_roc,
-                    'avg_psi': metric.avg_psi,
-                    'max_psi': metric.max_psi,
-                    'drift_alerts': metric.drift_alerts_count
-                })
+            staleness_sec = None
+            if metrics and metrics[0]['refreshed_at'] is not None:
+                staleness_sec = (datetime.utcnow() - metrics[0]['refreshed_at']).total_seconds()
             
             return {
                 'interval': interval,
                 'start_time': start_time,
                 'end_time': end_time,
+                'staleness_sec': staleness_sec,
                 'data_points': data_points
             }
-            
+        
         except Exception as e:
             logger.error(f"Error getting metrics timeseries: {e}")
             raise
     
-    def _get_baseline_features(self) -> pd.DataFrame:
-        """Get baseline feature statistics"""
-        # For simplicity, use first 10000 predictions as baseline
-        # In production, this would be stored during training
-        predictions = self.db.query(Prediction).limit(10000).all()
+    async def get_baseline_profile(self) -> Dict:
+        """
+        Get the baseline profile used for feature drift detection
+        
+        The profile is cached on the class per model version once the
+        baseline window is full, so later reports only process the current
+        window. The API warms it at startup.
+        
+        Returns:
+            Baseline profile from DriftDetector.fit_baseline
+        """
+        profiles = type(self)._baseline_profiles
+        profile = profiles.get(settings.MODEL_VERSION)
+        if profile is not None:
+            return profile
+        
+        baseline_df = await self._get_baseline_features()
+        profile = self.drift_detector.fit_baseline(baseline_df, list(DRIFT_FEATURES))
+        
+        # A partial (or synthetic) baseline still changes as predictions arrive
+        if len(baseline_df) >= self.BASELINE_SIZE:
+            profiles[settings.MODEL_VERSION] = profile
+            logger.info(
+                f"Cached drift baseline profile for {settings.MODEL_VERSION} "
+                f"({len(baseline_df)} rows)"
+            )
+        
+        return profile
+    
+    async def refresh_baseline(self) -> Dict:
+        """
+        Drop the cached baseline profile of the serving model version and
+        rebuild it
         
-        if not predictions:
+        Returns:
+            The new baseline profile
+        """
+        type(self)._baseline_profiles.pop(settings.MODEL_VERSION, None)
+        return await self.get_baseline_profile()
+    
+    async def _get_baseline_features(self) -> Union[pd.DataFrame, np.ndarray]:
+        """
+        Get baseline feature values (typed in SQL, no ORM rows)
+        
+        Returns:
+            (n, n_features) array in DRIFT_FEATURES order, or a synthetic
+            baseline DataFrame while there are no predictions
+        """
+        # For simplicity, use the model version's first 10000 predictions as
+        # baseline. In production, this would be stored during training
+        result = await self.db.execute(_BASELINE_FEATURES_STMT, {
+            'model_version': settings.MODEL_VERSION,
+            'limit': self.BASELINE_SIZE
+        })
+        rows = result.all()
+        
+        if not rows:
             # Return synthetic baseline if no predictions yet
-            from app.ml.data_generator import SyntheticDataGenerator
             generator = SyntheticDataGenerator()
             X, _ = generator.generate_baseline_data(1000)
             return X
         
-        # Extract features
-        features_list = [p.features for p in predictions]
-        df = pd.DataFrame(features_list)
-        
-        return df
+        return self._feature_matrix(rows)
+    
+    @staticmethod
+    def _window_params(start_time: datetime, end_time: datetime) -> Dict:
+        """Bind parameters for the prebuilt window statements"""
+        return {
+            'model_version': settings.MODEL_VERSION,
+            'start_time': start_time,
+            'end_time': end_time
+        }
     
-    def _get_current_features(
+    async def _get_current_window(
         self,
         start_time: datetime,
         end_time: datetime
-    ) -> pd.DataFrame:
-        """Get current feature data"""
-        predictions = self.db.query(Prediction).filter(
-            Prediction.prediction_timestamp >= start_time,
-            Prediction.prediction_timestamp <= end_time
-        ).all()
-        
-        if not predictions:
-            return pd.DataFrame()
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get current feature values and prediction probabilities (typed in
+        SQL, no ORM rows)
         
-        features_list = [p.features for p in predictions]
-        df = pd.DataFrame(features_list)
+        The window is read once, streamed in STREAM_CHUNK_SIZE partitions,
+        each packed into floats before the next is fetched, so only one
+        chunk of row tuples is alive at a time however long the window is.
         
-        return df
+        Returns:
+            (n, n_features) array in DRIFT_FEATURES order, and the (n,)
+            prediction probabilities
+        """
+        result = await self.db.stream(
+            _CURRENT_WINDOW_STMT, self._window_params(start_time, end_time)
+        )
+        try:
+            chunks = [np.array(rows, dtype=np.float64) async for rows in result.partitions()]
+        finally:
+            # Don't leave a half-read cursor behind if a chunk fails
+            await result.close()
+        if not chunks:
+            return self._feature_matrix([]), np.empty(0)
+        window = np.concatenate(chunks)
+        return window[:, :-1], np.ascontiguousarray(window[:, -1])
     
-    def _get_predictions(
-        self,
-        start_time: datetime,
-        end_time: datetime
-    ) -> np.ndarray:
-        """Get prediction probabilities"""
-        predictions = self.db.query(Prediction.prediction_proba).filter(
-            Prediction.prediction_timestamp >= start_time,
-            Prediction.prediction_timestamp <= end_time
-        ).all()
+    @staticmethod
+    def _feature_matrix(rows: List) -> np.ndarray:
+        """
+        Stack feature rows into one float array, skipping pandas
         
-        return np.array([p[0] for p in predictions])
+        Args:
+            rows: Result rows of the _FEATURE_COLUMNS select
+        
+        Returns:
+            (n, n_features) float64 array; missing keys come back as NULL,
+            i.e. NaN
+        """
+        if not rows:
+            return np.empty((0, len(DRIFT_FEATURES)))
+        return np.array(rows, dtype=np.float64)
     
-    def _calculate_performance_metrics(
+    async def _calculate_performance_metrics(
         self,
         start_time: datetime,
         end_time: datetime
     ) -> Dict:
-        """Calculate performance metrics (when ground truth is available)"""
-        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+        """
+        Calculate performance metrics (when ground truth is available)
+        
+        Aggregated in SQL: one row per probability bucket carries the
+        confusion counts, so no labelled rows are shipped to Python. AUC-ROC
+        is the trapezoidal area over the bucketed ROC curve.
+        """
+        empty = {
+            'accuracy': None,
+            'precision': None,
+            'recall': None,
+            'f1_score': None,
+            'auc_roc': None
+        }
         
         try:
-            # Query predictions with ground truth
-            results = self.db.query(
-                Prediction.prediction,
-                Prediction.prediction_proba,
-                GroundTruth.actual_label
-            ).join(
-                GroundTruth,
-                Prediction.transaction_id == GroundTruth.transaction_id
-            ).filter(
-                Prediction.prediction_timestamp >= start_time,
-                Prediction.prediction_timestamp <= end_time
-            ).all()
+            # Query confusion counts per probability bucket
+            result = await self.db.execute(
+                _PERFORMANCE_STMT, self._window_params(start_time, end_time)
+            )
+            rows = result.all()
             
-            if not results:
-                return {
-                    'accuracy': None,
-                    'precision': None,
-                    'recall': None,
-                    'f1_score': None,
-                    'auc_roc': None
-                }
+            if not rows:
+                return empty
             
-            y_pred = np.array([r[0] for r in results])
-            y_proba = np.array([r[1] for r in results])
-            y_true = np.array([r[2] for r in results])
+            # Columns: bucket, n, correct, tp, fp, pos (highest bucket first)
+            counts = np.array(rows, dtype=np.int64)[:, 1:]
+            n, correct, tp, fp, pos = counts.sum(axis=0).tolist()
+            neg = n - pos
             
-            metrics = {
-                'accuracy': float(accuracy_score(y_true, y_pred)),
-                'precision': float(precision_score(y_true, y_pred, zero_division=0)),
-                'recall': float(recall_score(y_true, y_pred, zero_division=0)),
-                'f1_score': float(f1_score(y_true, y_pred, zero_division=0)),
-                'auc_roc': float(roc_auc_score(y_true, y_proba)) if len(np.unique(y_true)) > 1 else None
-            }
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / pos if pos else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
             
-            return metrics
+            # Sweep the threshold down bucket by bucket: each bucket adds its
+            # negatives times the positives ranked above it (ties count half)
+            auc_roc = None
+            if pos and neg:
+                bucket_pos = counts[:, 4]
+                bucket_neg = counts[:, 0] - bucket_pos
+                pos_above = np.cumsum(bucket_pos) - bucket_pos
+                auc_roc = float(np.dot(bucket_neg, pos_above + 0.5 * bucket_pos) / (pos * neg))
             
-        except Exception as e:
-            logger.error(f"Error calculating performance metrics: {e}")
             return {
-                'accuracy': None,
-                'precision': None,
-                'recall': None,
-                'f1_score': None,
-                'auc_roc': None
+                'accuracy': correct / n,
+                'precision': precision,
+                'recall': recall,
+                'f1_score': f1,
+                'auc_roc': auc_roc
             }
+        
+        except Exception as e:
+            logger.error(f"Error calculating performance metrics: {e}")
+            return empty
     
     def _generate_alerts(
         self,
@@ -297,7 +452,7 @@ class MonitoringService:
         for report in feature_drift_reports:
             if report['severity'] in ['high', 'medium']:
                 alert = {
-                    'id': f"alert_{hash(report['feature_name']) % 10000}",
+                    'id': self._alert_id(report['feature_name']),
                     'type': 'data_drift',
                     'severity': report['severity'],
                     'message': (
@@ -312,6 +467,17 @@ class MonitoringService:
         
         return alerts
     
+    @staticmethod
+    def _alert_id(feature_name: str) -> str:
+        """
+        Stable alert ID for a feature
+        
+        Unlike the builtin hash(), xxh3 is not randomized per process, so
+        the same drift condition keeps its ID across restarts and workers.
+        """
+        digest = xxhash.xxh3_64_intdigest(feature_name.encode(), seed=settings.ALERT_HASH_SALT)
+        return f"alert_{digest}"
+    
     def _get_recommendation(self, drift_report: Dict) -> str:
         """Get recommendation for drift"""
         if drift_report['severity'] == 'high':
@@ -0,0 +1,216 @@
+"""Prediction Batcher - Buffer prediction rows and COPY them in batches"""
+
+import asyncio
+from typing import Dict, List, Optional
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError
+import logging
+
+from app.config import settings
+from app.database import engine, json_serializer
+from app.models import Prediction
+
+logger = logging.getLogger(__name__)
+
+# Columns written per prediction, in COPY order
+COPY_COLUMNS = (
+    'transaction_id',
+    'model_version',
+    'features',
+    'prediction',
+    'prediction_proba',
+    'feature_contributions',
+    'prediction_timestamp',
+    'latency_ms'
+)
+
+# JSONB columns, serialized before COPY
+_JSON_COLUMNS = frozenset(('features', 'feature_contributions'))
+
+# Errors a retry can't fix (bad values, schema mismatch); anything else,
+# e.g. a lost connection, keeps the rows buffered for the next flush
+_PERMANENT_ERRORS = (DataError, IntegrityError, ProgrammingError)
+
+# Longest pause between flush retries while writes keep failing (seconds)
+MAX_RETRY_DELAY = 5.0
+
+
+class PredictionBatcher:
+    """
+    Buffer prediction rows in memory and write them with binary COPY
+    
+    Request handlers only append to the buffer; a background task flushes
+    it every flush_interval seconds, or sooner once batch_size rows are
+    waiting. Rows whose write fails on a transient error (e.g. a database
+    restart) go back to the buffer and are retried on the next flush.
+    """
+    
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_pending: int = None):
+        """
+        Initialize batcher
+        
+        Args:
+            batch_size: Rows that trigger an early flush
+            flush_interval: Maximum seconds a row waits in the buffer
+            max_pending: Rows kept buffered while writes keep failing; the
+                oldest are dropped beyond that
+        """
+        self.batch_size = batch_size or settings.PREDICTION_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.PREDICTION_FLUSH_MS / 1000
+        self.max_pending = max_pending or settings.PREDICTION_BUFFER_MAX
+        self._pending: List[Dict] = []
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stop_requested = asyncio.Event()
+        self._failures = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether the background flush task is active"""
+        return self._task is not None and not self._task.done()
+    
+    @property
+    def pending(self) -> int:
+        """Rows waiting to be written"""
+        return len(self._pending)
+    
+    def add(self, row: Dict):
+        """
+        Queue one prediction row
+        
+        Args:
+            row: Column values keyed by COPY_COLUMNS
+        """
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+    
+    async def start(self):
+        """Start the background flush task"""
+        if not self.running:
+            # Bind the sync primitives to the running loop
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._stop_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background task and write whatever is still buffered"""
+        if self._task is not None:
+            # Let the loop finish its current flush rather than cancelling
+            # it mid-write, which would lose the batch it has taken
+            self._stop_requested.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error(f"Dropping {len(self._pending)} unwritten predictions on shutdown")
+            self._pending = []
+    
+    async def _run(self):
+        """
+        Flush on a timer, or early when a full batch is waiting
+        
+        While writes fail, retries back off exponentially instead (full
+        batches would otherwise wake the loop on every request).
+        """
+        while not self._stop_requested.is_set():
+            if self._failures:
+                delay = min(self.flush_interval * 2 ** min(self._failures, 16), MAX_RETRY_DELAY)
+                await self._wait(self._stop_requested, delay)
+            else:
+                await self._wait(self._wakeup, self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+    
+    @staticmethod
+    async def _wait(event: asyncio.Event, timeout: float):
+        """Wait until the event is set or the timeout passes"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def flush(self):
+        """Write all buffered rows, keeping them buffered if the write fails"""
+        async with self._lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return
+            
+            try:
+                await self._copy(rows)
+                self._failures = 0
+                return
+            except Exception as e:
+                # One bad row (e.g. a duplicate transaction_id) fails the whole
+                # COPY; retry the batch as an INSERT that skips conflicts
+                logger.warning(f"COPY of {len(rows)} predictions failed, inserting instead: {e}")
+            
+            try:
+                await self._insert(rows)
+                self._failures = 0
+            except _PERMANENT_ERRORS as e:
+                logger.error(f"Dropping {len(rows)} predictions that can't be written: {e}")
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} predictions, retrying: {e}")
+                self._failures += 1
+                self._requeue(rows)
+    
+    def _requeue(self, rows: List[Dict]):
+        """Put failed rows back ahead of those queued since, up to max_pending"""
+        self._pending = rows + self._pending
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            logger.error(f"Prediction buffer full, dropping the {overflow} oldest predictions")
+            del self._pending[:overflow]
+    
+    async def _copy(self, rows: List[Dict]):
+        """Write rows with COPY ... FROM STDIN (FORMAT BINARY)"""
+        records = [
+            tuple(
+                json_serializer(row[column])
+                if column in _JSON_COLUMNS and row[column] is not None
+                else row[column]
+                for column in COPY_COLUMNS
+            )
+            for row in rows
+        ]
+        
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                Prediction.__tablename__,
+                records=records,
+                columns=COPY_COLUMNS
+            )
+    
+    async def _insert(self, rows: List[Dict]):
+        """Write rows with a multi-row INSERT, skipping existing transactions"""
+        async with engine.begin() as conn:
+            await conn.execute(
+                insert(Prediction).on_conflict_do_nothing(
+                    index_elements=['transaction_id', 'prediction_timestamp']
+                ),
+                rows
+            )
+
+
+# Global batcher instance (singleton)
+_batcher_instance = None
+
+
+def get_prediction_batcher() -> PredictionBatcher:
+    """
+    Get or create global prediction batcher
+    
+    Returns:
+        PredictionBatcher instance
+    """
+    global _batcher_instance
+    
+    if _batcher_instance is None:
+        _batcher_instance = PredictionBatcher()
+    
+    return _batcher_instance
@@ -1,25 +1,69 @@
 """Prediction Service - Handle predictions and storage"""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Tuple
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Integer, String, Text, bindparam, cast, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
 import logging
-import uuid
+import operator
 
+from app.database import naive_utc
 from app.ml.model import get_model
-from app.models import Prediction, ModelRegistry
+from app.models import Prediction, GroundTruth, ModelRegistry, metrics_hourly
+from app.services.batch_predictor import get_batch_predictor
+from app.services.prediction_batcher import get_prediction_batcher
+from app.schemas import TransactionFeatures
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Model input order (the request schema declares fields in training order)
+FEATURE_ORDER = tuple(TransactionFeatures.model_fields)
+_FEATURE_NAMES = frozenset(FEATURE_ORDER)
+_get_features = operator.itemgetter(*FEATURE_ORDER)
+
+# Store a label only if its prediction exists, and return that prediction,
+# in one statement (no row back = unknown transaction). transaction_id is
+# only unique per prediction_timestamp, so a resent transaction is labelled
+# on its latest prediction, which the label references by both columns.
+_FEEDBACK_STMT = insert(GroundTruth.__table__).from_select(
+    [
+        'transaction_id',
+        'prediction_timestamp',
+        'actual_label',
+        'label_source',
+        'feedback_timestamp',
+        'confidence',
+        'notes'
+    ],
+    select(
+        Prediction.transaction_id,
+        Prediction.prediction_timestamp,
+        bindparam('actual_label', type_=Integer),
+        bindparam('label_source', type_=String),
+        bindparam('feedback_timestamp', type_=DateTime),
+        bindparam('confidence', type_=String),
+        bindparam('notes', type_=Text)
+    ).where(
+        Prediction.transaction_id == bindparam('transaction_id')
+    ).order_by(Prediction.prediction_timestamp.desc()).limit(1)
+).returning(
+    select(Prediction.prediction).where(
+        Prediction.transaction_id == bindparam('transaction_id')
+    ).order_by(Prediction.prediction_timestamp.desc()).limit(1).scalar_subquery()
+)
+
 
 class PredictionService:
     """Service for making predictions and storing results"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """Initialize service with database session"""
         self.db = db
         self.model = get_model()
+        # Build input vectors directly unless the loaded model expects another order
+        self._vectorize = tuple(self.model.feature_names) == FEATURE_ORDER
     
     async def make_prediction(
         self,
@@ -34,34 +78,48 @@ class PredictionService:
             transaction_id: Unique transaction ID
             features: Feature dictionary
             timestamp: Prediction timestamp
-            
+        
         Returns:
             Prediction result dictionary
         """
         if timestamp is None:
             timestamp = datetime.utcnow()
+        else:
+            timestamp = naive_utc(timestamp)
         
         try:
-            # Make prediction
-            prediction, probability, contributions, latency = self.model.predict(
-                features,
-                compute_contributions=True
-            )
+            # Make prediction: micro-batched with concurrent requests when
+            # the batch predictor is running and rows can be stacked as-is
+            predictor = get_batch_predictor()
+            if predictor.running and self._vectorize:
+                prediction, probability, contributions, latency = await predictor.predict(
+                    self._feature_vector(features)
+                )
+            else:
+                prediction, probability, contributions, latency = self.model.predict(
+                    self._feature_vector(features) if self._vectorize else features,
+                    compute_contributions=True
+                )
             
-            # Store in database
-            db_prediction = Prediction(
-                transaction_id=transaction_id,
-                model_version=self.model.version,
-                features=features,
-                prediction=prediction,
-                prediction_proba=probability,
-                feature_contributions=contributions,
-                prediction_timestamp=timestamp,
-                latency_ms=latency
-            )
-            
-            self.db.add(db_prediction)
-            self.db.commit()
+            # Store in database: queued for the next batched COPY when the
+            # batcher is running, else a Core insert (id/created_at are
+            # filled in by Postgres either way)
+            row = {
+                'transaction_id': transaction_id,
+                'model_version': self.model.version,
+                'features': features,
+                'prediction': prediction,
+                'prediction_proba': probability,
+                'feature_contributions': contributions,
+                'prediction_timestamp': timestamp,
+                'latency_ms': latency
+            }
+            batcher = get_prediction_batcher()
+            if batcher.running:
+                batcher.add(row)
+            else:
+                await self.db.execute(insert(Prediction).values(**row))
+                await self.db.commit()
             
             # Prepare response
             result = {
@@ -77,15 +135,32 @@ class PredictionService:
                 'feature_contributions': contributions
             }
             
-            logger.debug(f"Prediction made: {transaction_id} -> {prediction} (prob={probability:.4f})")
+            logger.debug("Prediction made: %s -> %d (prob=%.4f)", transaction_id, prediction, probability)
             
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error making prediction: {e}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
     
+    @staticmethod
+    def _feature_vector(features: Dict[str, float]) -> np.ndarray:
+        """
+        Build a (1, n_features) float32 model input in FEATURE_ORDER
+        
+        Args:
+            features: Feature dictionary
+        
+        Returns:
+            Feature vector
+        """
+        try:
+            return np.array([_get_features(features)], dtype=np.float32)
+        except KeyError:
+            missing = set(_FEATURE_NAMES.difference(features))
+            raise ValueError(f"Missing features: {missing}")
+    
     async def submit_feedback(
         self,
         transaction_id: str,
@@ -105,42 +180,43 @@ class PredictionService:
             feedback_timestamp: Feedback timestamp
             confidence: Confidence level
             notes: Additional notes
-            
+        
         Returns:
             Feedback result dictionary
         """
-        from app.models import GroundTruth
-        
         if feedback_timestamp is None:
             feedback_timestamp = datetime.utcnow()
+        else:
+            feedback_timestamp = naive_utc(feedback_timestamp)
         
         try:
-            # Check if prediction exists
-            prediction = self.db.query(Prediction).filter(
-                Prediction.transaction_id == transaction_id
-            ).first()
+            # Store ground truth (and get the prediction back) in one round trip
+            params = {
+                'transaction_id': transaction_id,
+                'actual_label': actual_label,
+                'label_source': label_source,
+                'feedback_timestamp': feedback_timestamp,
+                'confidence': confidence,
+                'notes': notes
+            }
+            prediction = (await self.db.execute(_FEEDBACK_STMT, params)).scalar()
             
-            if not prediction:
-                raise ValueError(f"Prediction not found: {transaction_id}")
+            batcher = get_prediction_batcher()
+            if prediction is None and batcher.pending:
+                # It may still be buffered; write it out and try again
+                await batcher.flush()
+                prediction = (await self.db.execute(_FEEDBACK_STMT, params)).scalar()
             
-            # Store ground truth
-            ground_truth = GroundTruth(
-                transaction_id=transaction_id,
-                actual_label=actual_label,
-                label_source=label_source,
-                feedback_timestamp=feedback_timestamp,
-                confidence=confidence,
-                notes=notes
-            )
+            if prediction is None:
+                raise ValueError(f"Prediction not found: {transaction_id}")
             
-            self.db.add(ground_truth)
-            self.db.commit()
+            await self.db.commit()
             
             # Check if prediction was correct
-            was_correct = (prediction.prediction == actual_label)
+            was_correct = (prediction == actual_label)
             
             # Calculate recent accuracy (optional)
-            recent_accuracy = self._calculate_recent_accuracy()
+            recent_accuracy = await self._calculate_recent_accuracy()
             
             result = {
                 'status': 'accepted',
@@ -150,42 +226,57 @@ class PredictionService:
                 'current_accuracy_24h': recent_accuracy
             }
             
-            logger.info(f"Feedback submitted: {transaction_id} -> {actual_label} (correct={was_correct})")
+            logger.info("Feedback submitted: %s -> %s (correct=%s)", transaction_id, actual_label, was_correct)
             
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error submitting feedback: {e}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
     
-    def _calculate_recent_accuracy(self, hours: int = 24) -> float:
-        """Calculate accuracy for recent predictions with ground truth"""
-        from app.models import GroundTruth
-        from datetime import timedelta
+    async def _calculate_recent_accuracy(self, hours: int = 24) -> float:
+        """
+        Calculate accuracy for recent predictions with ground truth
         
+        Rolled up from the hourly metrics view (refreshed by the monitoring
+        worker), so at most `hours` rows are read however busy the window
+        was. Until the view has labels for the window, e.g. right after
+        deployment, it is averaged from the raw join instead.
+        """
         try:
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
             
-            # Query predictions with ground truth
-            results = self.db.query(
-                Prediction.prediction,
-                GroundTruth.actual_label
-            ).join(
-                GroundTruth,
-                Prediction.transaction_id == GroundTruth.transaction_id
-            ).filter(
-                Prediction.prediction_timestamp >= cutoff_time
-            ).all()
-            
-            if not results:
-                return None
+            # Hourly accuracies weighted by their label counts
+            labels = func.sum(metrics_hourly.c.labels_received)
+            accuracy = await self.db.scalar(
+                select(
+                    func.sum(metrics_hourly.c.accuracy * metrics_hourly.c.labels_received)
+                    / func.nullif(labels, 0)
+                ).where(
+                    metrics_hourly.c.ts >= cutoff_time.replace(minute=0, second=0, microsecond=0)
+                )
+            )
             
-            correct = sum(1 for pred, actual in results if pred == actual)
-            accuracy = correct / len(results)
+            if accuracy is None:
+                # Averaged server-side: one scalar instead of every labelled row
+                accuracy = await self.db.scalar(
+                    select(
+                        func.avg(cast(Prediction.prediction == GroundTruth.actual_label, Integer))
+                    ).join(
+                        GroundTruth,
+                        (Prediction.transaction_id == GroundTruth.transaction_id)
+                        & (Prediction.prediction_timestamp == GroundTruth.prediction_timestamp)
+                    ).where(
+                        Prediction.prediction_timestamp >= cutoff_time
+                    )
+                )
             
-            return round(accuracy, 4)
+            if accuracy is None:
+                return None
             
+            return round(float(accuracy), 4)
+        
         except Exception as e:
             logger.error(f"Error calculating recent accuracy: {e}")
             return None
@@ -0,0 +1,56 @@
+"""Tests for response cache keys and invalidation"""
+
+import asyncio
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.decorator import cache
+
+from app.cache import DRIFT_NAMESPACE, drift_key_builder, invalidate, query_key_builder
+
+
+@pytest.fixture(autouse=True)
+def in_memory_cache():
+    """Cache backed by process memory, with the app's key prefix"""
+    backend = InMemoryBackend()
+    backend._store.clear()
+    FastAPICache.init(backend, prefix="mdd")
+    yield backend
+    backend._store.clear()
+    FastAPICache.reset()
+
+
+def _report():
+    return None
+
+
+@pytest.mark.parametrize("builder", [drift_key_builder, query_key_builder])
+@pytest.mark.parametrize("namespace", [DRIFT_NAMESPACE, f"mdd:{DRIFT_NAMESPACE}"])
+def test_key_carries_prefix_once(builder, namespace):
+    key = builder(_report, namespace, kwargs={"hours": 1})
+    assert key.startswith(f"mdd:{DRIFT_NAMESPACE}:")
+    assert not key.startswith("mdd:mdd:")
+
+
+def test_invalidate_removes_cached_response(in_memory_cache):
+    calls = []
+
+    @cache(expire=60, namespace=DRIFT_NAMESPACE, key_builder=drift_key_builder)
+    async def get_report(hours: int = 1):
+        calls.append(hours)
+        return {"hours": hours, "call": len(calls)}
+
+    async def scenario():
+        first = await get_report(hours=1)
+        assert await get_report(hours=1) == first
+        assert len(calls) == 1
+        assert any(key.startswith(f"mdd:{DRIFT_NAMESPACE}:") for key in in_memory_cache._store)
+
+        await invalidate(DRIFT_NAMESPACE)
+        assert not in_memory_cache._store
+
+        await get_report(hours=1)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+"""Tests for buffered prediction writes"""
+
+import asyncio
+
+from sqlalchemy.exc import DataError
+
+from app.services.prediction_batcher import PredictionBatcher
+
+
+class FlakyBatcher(PredictionBatcher):
+    """Batcher whose writes fail a given number of times, then succeed"""
+    
+    def __init__(self, failures: int = 0, error: Exception = None, write_delay: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.error = error or ConnectionError("database unavailable")
+        self.write_delay = write_delay
+        self.written = []
+    
+    async def _copy(self, rows):
+        await asyncio.sleep(self.write_delay)
+        if self.failures:
+            raise self.error
+        self.written.extend(rows)
+    
+    async def _insert(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.written.extend(rows)
+
+
+def _rows(n, start=0):
+    return [{'transaction_id': f"txn_{i}"} for i in range(start, start + n)]
+
+
+def test_failed_write_is_retried_in_order():
+    async def scenario():
+        batcher = FlakyBatcher(failures=2, batch_size=10, flush_interval=60)
+        for row in _rows(3):
+            batcher.add(row)
+        
+        await batcher.flush()
+        await batcher.flush()
+        assert batcher.written == [] and batcher.pending == 3
+        
+        for row in _rows(2, start=3):
+            batcher.add(row)
+        await batcher.flush()
+        assert [row['transaction_id'] for row in batcher.written] == [f"txn_{i}" for i in range(5)]
+        assert batcher.pending == 0
+    
+    asyncio.run(scenario())
+
+
+def test_permanent_error_drops_batch():
+    async def scenario():
+        batcher = FlakyBatcher(failures=1, error=DataError("INSERT", {}, Exception("bad value")))
+        for row in _rows(3):
+            batcher.add(row)
+        await batcher.flush()
+        assert batcher.pending == 0 and batcher.written == []
+    
+    asyncio.run(scenario())
+
+
+def test_requeue_keeps_newest_rows_within_limit():
+    async def scenario():
+        batcher = FlakyBatcher(failures=1, max_pending=4)
+        for row in _rows(3):
+            batcher.add(row)
+        flush = asyncio.create_task(batcher.flush())
+        await asyncio.sleep(0)
+        for row in _rows(3, start=3):
+            batcher.add(row)
+        await flush
+        assert [row['transaction_id'] for row in batcher._pending] == ["txn_2", "txn_3", "txn_4", "txn_5"]
+    
+    asyncio.run(scenario())
+
+
+def test_stop_finishes_in_flight_flush():
+    async def scenario():
+        batcher = FlakyBatcher(write_delay=0.05, batch_size=2, flush_interval=60)
+        await batcher.start()
+        for row in _rows(2):
+            batcher.add(row)
+        await asyncio.sleep(0.01)  # The loop has taken the batch and is writing it
+        assert batcher.pending == 0
+        
+        await batcher.stop()
+        assert len(batcher.written) == 2
+    
+    asyncio.run(scenario())
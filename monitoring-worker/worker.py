@@ -1,13 +1,18 @@
 """Background Monitoring Worker - Calculate Metrics and Detect Drift"""
 
 import os
+import io
+import csv
 import sys
 import time
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-import schedule
+import numpy as np
+import psutil
+from scipy import stats
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +28,36 @@ DATABASE_URL = os.getenv(
 )
 
 MONITORING_INTERVAL = int(os.getenv("MONITORING_INTERVAL", "30"))  # seconds
+METRICS_REFRESH_INTERVAL = int(os.getenv("METRICS_REFRESH_INTERVAL", "60"))  # seconds
+PARTITION_MAINTENANCE_INTERVAL = 24 * 60 * 60  # seconds
+
+# Prediction drift: KS test of the last hour's fraud probabilities against
+# the first DRIFT_REFERENCE_SIZE predictions of the model version
+MODEL_VERSION = os.getenv("MODEL_VERSION", "xgb_v1.0.0")
+DRIFT_REFERENCE_SIZE = int(os.getenv("DRIFT_REFERENCE_SIZE", "10000"))
+DRIFT_P_VALUE = float(os.getenv("DRIFT_P_VALUE", "0.01"))
+
+# Both samples are compared as histograms over [0, 1]; the KS statistic is
+# then exact up to the mass within one bin
+PROBA_BINS = 1000
+
+# Alert columns written by COPY, in CSV field order
+ALERT_COLUMNS = (
+    "alert_type",
+    "severity",
+    "title",
+    "message",
+    "metric_value",
+    "threshold_value",
+    "triggered_at",
+)
+
+# Range-partitioned tables: (table, partition unit, partitions kept ahead)
+TIME_PARTITIONS = (
+    ("predictions", "day", 7),
+    ("metrics_history", "day", 7),
+    ("system_health", "week", 4),
+)
 
 
 class MonitoringWorker:
@@ -32,6 +67,14 @@ class MonitoringWorker:
         """Initialize worker"""
         self.engine = create_engine(DATABASE_URL, pool_pre_ping=True)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        # Reference prediction_proba histogram, built once it is complete
+        self._reference: np.ndarray = None
+        self._reference_mean: float = None
+        
+        # Prime the CPU counter; each cycle then reads usage since the last
+        # call without blocking
+        psutil.cpu_percent(interval=None)
+        
         logger.info("Monitoring worker initialized")
     
     def run_monitoring_cycle(self):
@@ -42,152 +85,270 @@ class MonitoringWorker:
         
         session = self.SessionLocal()
         try:
+            # Alerts raised during the cycle, written together at the end
+            alerts = []
+            
             # Calculate and store metrics
             self._calculate_metrics(session)
             
             # Check for drift
-            self._check_drift(session)
+            self._check_drift(session, alerts)
             
             # Update system health
             self._update_system_health(session)
             
+            self._write_alerts(session, alerts)
             session.commit()
             
             elapsed = time.time() - start_time
             logger.info(f"Monitoring cycle completed in {elapsed:.2f}s")
             logger.info("=" * 60)
-            
+        
         except Exception as e:
             logger.error(f"Error in monitoring cycle: {e}", exc_info=True)
             session.rollback()
         finally:
             session.close()
     
+    def refresh_metrics_view(self):
+        """Refresh the hourly metrics materialized view read by the API"""
+        session = self.SessionLocal()
+        try:
+            start_time = time.time()
+            # CONCURRENTLY keeps the view readable while it is rebuilt
+            session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY metrics_hourly"))
+            # The API reports staleness from this row
+            session.execute(text("""
+                INSERT INTO view_refreshes (view_name, refreshed_at)
+                VALUES ('metrics_hourly', now() AT TIME ZONE 'UTC')
+                ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+            """))
+            session.commit()
+            logger.info(f"Refreshed metrics_hourly in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.error(f"Error refreshing metrics view: {e}")
+            session.rollback()
+        finally:
+            session.close()
+    
+    def maintain_partitions(self):
+        """Create upcoming partitions for the time-partitioned tables"""
+        session = self.SessionLocal()
+        try:
+            for table, unit, ahead in TIME_PARTITIONS:
+                session.execute(
+                    text("SELECT create_time_partitions(:table, :unit, :ahead)"),
+                    {"table": table, "unit": unit, "ahead": ahead}
+                )
+            session.commit()
+            logger.info(f"Partitions ensured for {', '.join(t for t, _, _ in TIME_PARTITIONS)}")
+        except Exception as e:
+            logger.error(f"Error maintaining partitions: {e}")
+            session.rollback()
+        finally:
+            session.close()
+    
     def _calculate_metrics(self, session):
         """Calculate and store current metrics"""
-        from sqlalchemy import text
-        
         try:
             # Get counts for last hour
             one_hour_ago = datetime.utcnow() - timedelta(hours=1)
             
-            # Count predictions
-            result = session.execute(
-                text("""
-                    SELECT COUNT(*) as pred_count
-                    FROM predictions
-                    WHERE prediction_timestamp >= :time_threshold
-                """),
-                {"time_threshold": one_hour_ago}
-            ).fetchone()
-            
-            predictions_count = result[0] if result else 0
-            
-            # Count ground truth labels
+            # Count predictions and labels, compute accuracy and store the
+            # row in one round trip
             result = session.execute(
-                text("""
-                    SELECT COUNT(*) as label_count
-                    FROM ground_truth
-                    WHERE feedback_timestamp >= :time_threshold
-                """),
-                {"time_threshold": one_hour_ago}
-            ).fetchone()
-            
-            labels_count = result[0] if result else 0
-            
-            # Calculate accuracy if we have labels
-            accuracy = None
-            if labels_count > 0:
-                result = session.execute(
-                    text("""
-                        SELECT 
-                            SUM(CASE WHEN p.prediction = g.actual_label THEN 1 ELSE 0 END)::float / COUNT(*) as accuracy
-                        FROM predictions p
-                        JOIN ground_truth g ON p.transaction_id = g.transaction_id
-                        WHERE p.prediction_timestamp >= :time_threshold
-                    """),
-                    {"time_threshold": one_hour_ago}
-                ).fetchone()
-                
-                accuracy = float(result[0]) if result and result[0] else None
-            
-            # Store metrics
-            session.execute(
                 text("""
                     INSERT INTO metrics_history 
                     (timestamp, model_version, predictions_count, labels_received, accuracy)
-                    VALUES (:timestamp, :model_version, :pred_count, :label_count, :accuracy)
+                    SELECT
+                        :timestamp,
+                        :model_version,
+                        (SELECT COUNT(*) FROM predictions
+                         WHERE prediction_timestamp >= :time_threshold),
+                        (SELECT COUNT(*) FROM ground_truth
+                         WHERE feedback_timestamp >= :time_threshold),
+                        (SELECT AVG((p.prediction = g.actual_label)::int)::float
+                         FROM predictions p
+                         JOIN ground_truth g
+                           ON g.transaction_id = p.transaction_id
+                          AND g.prediction_timestamp = p.prediction_timestamp
+                         WHERE p.prediction_timestamp >= :time_threshold)
+                    RETURNING predictions_count, labels_received, accuracy
                 """),
                 {
                     "timestamp": datetime.utcnow(),
                     "model_version": os.getenv("MODEL_VERSION", "xgb_v1.0.0"),
-                    "pred_count": predictions_count,
-                    "label_count": labels_count,
-                    "accuracy": accuracy
+                    "time_threshold": one_hour_ago
                 }
-            )
+            ).fetchone()
+            
+            predictions_count, labels_count, accuracy = result
             
             logger.info(f"Metrics calculated: predictions={predictions_count}, "
                        f"labels={labels_count}, accuracy={accuracy}")
-            
+        
         except Exception as e:
             logger.error(f"Error calculating metrics: {e}")
     
-    def _check_drift(self, session):
-        """Check for drift in features and predictions"""
+    def _check_drift(self, session, alerts: list):
+        """
+        Check for drift in the prediction distribution
+        
+        Args:
+            session: Database session
+            alerts: Alert rows (dicts keyed by ALERT_COLUMNS); appended to
+        """
         try:
-            # Simple drift check - count predictions in last hour vs baseline
-            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+            reference = self._get_reference(session)
+            if reference is None:
+                return
             
-            from sqlalchemy import text
-            result = session.execute(
+            # Bucketed server-side: at most PROBA_BINS rows come back
+            # however many predictions the hour holds
+            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+            rows = session.execute(
                 text("""
-                    SELECT AVG(prediction_proba) as avg_proba
+                    SELECT
+                        LEAST(width_bucket(prediction_proba, 0, 1, :bins), :bins) AS bucket,
+                        COUNT(*),
+                        SUM(prediction_proba)
                     FROM predictions
-                    WHERE prediction_timestamp >= :time_threshold
+                    WHERE model_version = :model_version
+                    AND prediction_timestamp >= :time_threshold
+                    GROUP BY bucket
                 """),
-                {"time_threshold": one_hour_ago}
-            ).fetchone()
+                {
+                    "bins": PROBA_BINS,
+                    "model_version": MODEL_VERSION,
+                    "time_threshold": one_hour_ago
+                }
+            ).all()
             
-            if result and result[0]:
-                avg_proba = float(result[0])
-                baseline_fraud_rate = 0.02  # 2% baseline
-                
-                # Check if significantly different
-                if abs(avg_proba - baseline_fraud_rate) > 0.03:
-                    logger.warning(f"Prediction drift detected! "
-                                 f"Current fraud rate: {avg_proba:.4f}, "
-                                 f"Baseline: {baseline_fraud_rate:.4f}")
-                    
-                    # Create alert
-                    session.execute(
-                        text("""
-                            INSERT INTO alerts 
-                            (alert_type, severity, title, message, triggered_at)
-                            VALUES (:type, :severity, :title, :message, :triggered_at)
-                        """),
-                        {
-                            "type": "prediction_drift",
-                            "severity": "medium",
-                            "title": "Prediction Distribution Drift",
-                            "message": f"Average fraud probability shifted from {baseline_fraud_rate:.4f} to {avg_proba:.4f}",
-                            "triggered_at": datetime.utcnow()
-                        }
-                    )
-                else:
-                    logger.info(f"No significant drift detected. Fraud rate: {avg_proba:.4f}")
+            if not rows:
+                logger.info("No predictions in the last hour, skipping drift check")
+                return
             
+            buckets, counts, sums = (np.array(column, dtype=np.float64) for column in zip(*rows))
+            current = np.zeros(PROBA_BINS)
+            current[buckets.astype(np.int64) - 1] = counts
+            n_current = int(counts.sum())
+            
+            # Two-sample KS on the whole distribution rather than its mean
+            ks_statistic, p_value = self._ks_test(reference, current)
+            avg_proba = float(sums.sum() / n_current)
+            baseline_proba = self._reference_mean
+            
+            if p_value < DRIFT_P_VALUE:
+                logger.warning(f"Prediction drift detected! "
+                             f"KS={ks_statistic:.4f}, p={p_value:.2e}, "
+                             f"mean fraud probability {baseline_proba:.4f} -> {avg_proba:.4f}")
+                
+                # Create alert
+                alerts.append({
+                    "alert_type": "prediction_drift",
+                    "severity": "medium",
+                    "title": "Prediction Distribution Drift",
+                    "message": f"Fraud probability distribution shifted (KS={ks_statistic:.4f}, "
+                               f"p={p_value:.2e}); mean {baseline_proba:.4f} -> {avg_proba:.4f}",
+                    "metric_value": float(p_value),
+                    "threshold_value": DRIFT_P_VALUE,
+                    "triggered_at": datetime.utcnow()
+                })
+            else:
+                logger.info(f"No significant drift detected. KS={ks_statistic:.4f}, "
+                           f"p={p_value:.4f}, fraud rate: {avg_proba:.4f}")
+        
         except Exception as e:
             logger.error(f"Error checking drift: {e}")
     
+    @staticmethod
+    def _write_alerts(session, alerts: list):
+        """
+        Write the cycle's alerts with one COPY instead of an INSERT each
+        
+        Runs on the session's connection, so the alerts commit (or roll
+        back) with the rest of the cycle.
+        
+        Args:
+            session: Database session
+            alerts: Alert rows keyed by ALERT_COLUMNS
+        """
+        if not alerts:
+            return
+        
+        payload = io.StringIO()
+        writer = csv.writer(payload)
+        for alert in alerts:
+            writer.writerow(alert[column] for column in ALERT_COLUMNS)
+        payload.seek(0)
+        
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY alerts ({', '.join(ALERT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                payload
+            )
+        finally:
+            cursor.close()
+        logger.info(f"Stored {len(alerts)} alert(s)")
+    
+    @staticmethod
+    def _ks_test(reference: np.ndarray, current: np.ndarray):
+        """
+        Two-sample KS statistic and asymptotic p-value from two histograms
+        over the same bins (as ks_2samp(method='asymp') on the raw samples)
+        """
+        n_reference, n_current = reference.sum(), current.sum()
+        ks_statistic = float(np.abs(
+            np.cumsum(reference) / n_reference - np.cumsum(current) / n_current
+        ).max())
+        en = np.round(n_reference * n_current / (n_reference + n_current))
+        p_value = float(np.clip(stats.kstwo.sf(ks_statistic, max(en, 1)), 0.0, 1.0))
+        return ks_statistic, p_value
+    
+    def _get_reference(self, session) -> np.ndarray:
+        """
+        Reference fraud-probability histogram: the first
+        DRIFT_REFERENCE_SIZE predictions of the model version, in
+        PROBA_BINS bins
+        
+        Cached once complete; until then it is re-read each cycle and the
+        drift check is skipped.
+        """
+        if self._reference is not None:
+            return self._reference
+        
+        reference = np.fromiter(
+            session.execute(
+                text("""
+                    SELECT prediction_proba
+                    FROM predictions
+                    WHERE model_version = :model_version
+                    ORDER BY prediction_timestamp
+                    LIMIT :limit
+                """),
+                {"model_version": MODEL_VERSION, "limit": DRIFT_REFERENCE_SIZE}
+            ).scalars(),
+            dtype=np.float64
+        )
+        
+        if len(reference) < DRIFT_REFERENCE_SIZE:
+            logger.info(f"Drift reference incomplete ({len(reference)}/{DRIFT_REFERENCE_SIZE} "
+                       f"predictions), skipping drift check")
+            return None
+        
+        # Same buckets as width_bucket(x, 0, 1, PROBA_BINS), with 1.0 in the last
+        buckets = np.minimum((reference * PROBA_BINS).astype(np.int64), PROBA_BINS - 1)
+        self._reference = np.bincount(buckets, minlength=PROBA_BINS).astype(np.float64)
+        self._reference_mean = float(reference.mean())
+        logger.info(f"Drift reference loaded: {len(reference)} predictions of {MODEL_VERSION}")
+        return self._reference
+    
     def _update_system_health(self, session):
         """Update system health metrics"""
-        from sqlalchemy import text
-        import psutil
-        
         try:
             # Get system metrics
-            cpu_usage = psutil.cpu_percent(interval=1)
+            cpu_usage = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             memory_usage = memory.percent
             
@@ -208,42 +369,73 @@ class MonitoringWorker:
             )
             
             logger.info(f"System health: CPU={cpu_usage:.1f}%, Memory={memory_usage:.1f}%")
-            
+        
         except Exception as e:
             logger.error(f"Error updating system health: {e}")
     
-    def start(self):
+    async def _run_every(self, interval: float, job):
+        """
+        Run a job every `interval` seconds until cancelled
+        
+        Deadlines are fixed multiples of the interval, so cycles don't drift
+        by the job's own runtime, and the loop sleeps until the next one
+        instead of polling. The job runs in a thread so the event loop (and
+        the other timers) never wait on its DB calls.
+        
+        Args:
+            interval: Seconds between runs
+            job: Blocking callable to run
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + interval
+        while True:
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+            try:
+                await asyncio.to_thread(job)
+            except Exception as e:
+                logger.error(f"Error in {job.__name__}: {e}", exc_info=True)
+            
+            # Skip deadlines missed while a slow run was in progress
+            deadline += interval
+            while deadline <= loop.time():
+                deadline += interval
+    
+    async def start(self):
         """Start the monitoring worker"""
         logger.info("=" * 60)
         logger.info("ML Drift Detection - Monitoring Worker")
         logger.info("=" * 60)
         logger.info(f"Monitoring interval: {MONITORING_INTERVAL} seconds")
+        logger.info(f"Metrics view refresh interval: {METRICS_REFRESH_INTERVAL} seconds")
         logger.info(f"Database: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else 'configured'}")
         logger.info("=" * 60)
         
         # Run initial cycle after a short delay
-        time.sleep(10)
-        self.run_monitoring_cycle()
+        await asyncio.sleep(10)
+        await asyncio.to_thread(self.maintain_partitions)
+        await asyncio.to_thread(self.run_monitoring_cycle)
+        await asyncio.to_thread(self.refresh_metrics_view)
         
         # Schedule regular monitoring
-        schedule.every(MONITORING_INTERVAL).seconds.do(self.run_monitoring_cycle)
+        tasks = [
+            asyncio.create_task(self._run_every(MONITORING_INTERVAL, self.run_monitoring_cycle)),
+            asyncio.create_task(self._run_every(METRICS_REFRESH_INTERVAL, self.refresh_metrics_view)),
+            asyncio.create_task(self._run_every(PARTITION_MAINTENANCE_INTERVAL, self.maintain_partitions))
+        ]
         
         logger.info("Worker started. Running monitoring cycles...")
         
-        # Run scheduled tasks
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-            except KeyboardInterrupt:
-                logger.info("Monitoring worker stopped by user")
-                break
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}", exc_info=True)
-                time.sleep(5)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 if __name__ == "__main__":
     worker = MonitoringWorker()
-    worker.start()
+    try:
+        asyncio.run(worker.start())
+    except KeyboardInterrupt:
+        logger.info("Monitoring worker stopped by user")
 
@@ -21,39 +21,109 @@ CREATE TABLE IF NOT EXISTS model_registry (
 CREATE INDEX idx_model_version ON model_registry(version);
 CREATE INDEX idx_model_status ON model_registry(status);
 
+-- Time-range partitions (predictions and metrics_history by day,
+-- system_health by week).
+-- Creates the partition for the current unit plus `ahead` more; the
+-- monitoring worker calls it daily so inserts never reach the DEFAULT
+-- partition, and expired partitions are dropped whole by clean_old_data.
+CREATE OR REPLACE FUNCTION create_time_partitions(parent TEXT, unit TEXT, ahead INTEGER)
+RETURNS void AS $$
+DECLARE
+    step INTERVAL := ('1 ' || unit)::INTERVAL;
+    lower_bound TIMESTAMP := date_trunc(unit, NOW() AT TIME ZONE 'UTC');
+BEGIN
+    FOR i IN 0..ahead LOOP
+        BEGIN
+            EXECUTE 'CREATE TABLE IF NOT EXISTS '
+                || quote_ident(parent || '_p' || to_char(lower_bound, 'YYYYMMDD'))
+                || ' PARTITION OF ' || quote_ident(parent)
+                || ' FOR VALUES FROM (' || quote_literal(lower_bound)
+                || ') TO (' || quote_literal(lower_bound + step) || ')';
+        EXCEPTION WHEN check_violation THEN
+            -- Rows for this range already sit in the DEFAULT partition
+            RAISE WARNING 'Skipping % partition from %: DEFAULT partition has rows in range', parent, lower_bound;
+        END;
+        lower_bound := lower_bound + step;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION drop_time_partitions(parent TEXT, older_than TIMESTAMP)
+RETURNS void AS $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::TIMESTAMP AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent::regclass
+    LOOP
+        -- The DEFAULT partition has no upper bound and is never dropped
+        IF part.upper_bound <= older_than THEN
+            -- Detached first: a partition referenced by a foreign key
+            -- can't be dropped directly
+            EXECUTE 'ALTER TABLE ' || quote_ident(parent) || ' DETACH PARTITION ' || quote_ident(part.relname);
+            EXECUTE 'DROP TABLE ' || quote_ident(part.relname);
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Predictions table (partitioned by date for performance)
+-- The partition key has to be part of every unique constraint, so a
+-- transaction_id is unique per prediction_timestamp
 CREATE TABLE IF NOT EXISTS predictions (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    transaction_id VARCHAR(100) UNIQUE NOT NULL,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    transaction_id VARCHAR(100) NOT NULL,
     model_version VARCHAR(50) NOT NULL,
     features JSONB NOT NULL,
     prediction INTEGER NOT NULL,
     prediction_proba FLOAT NOT NULL,
     feature_contributions JSONB,
     prediction_timestamp TIMESTAMP NOT NULL,
-    latency_ms FLOAT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    latency_ms REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Most queried features, extracted once on write
+    amount DOUBLE PRECISION GENERATED ALWAYS AS ((features->>'amount')::float8) STORED,
+    hour_of_day INTEGER GENERATED ALWAYS AS ((features->>'hour_of_day')::numeric::int) STORED,
+    merchant_risk_score DOUBLE PRECISION GENERATED ALWAYS AS ((features->>'merchant_risk_score')::float8) STORED,
+    PRIMARY KEY (id, prediction_timestamp),
+    UNIQUE (transaction_id, prediction_timestamp)
+) PARTITION BY RANGE (prediction_timestamp);
+
+CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT;
+SELECT create_time_partitions('predictions', 'day', 7);
 
 -- Create indexes for performance
 CREATE INDEX idx_predictions_timestamp ON predictions(prediction_timestamp DESC);
 CREATE INDEX idx_predictions_model_version ON predictions(model_version);
-CREATE INDEX idx_predictions_transaction_id ON predictions(transaction_id);
+CREATE INDEX idx_predictions_model_time ON predictions(model_version, prediction_timestamp DESC);
+CREATE INDEX idx_predictions_time_txn ON predictions(prediction_timestamp, transaction_id) INCLUDE (prediction);
+CREATE INDEX idx_predictions_amount ON predictions (amount);
+CREATE INDEX idx_predictions_hour ON predictions (hour_of_day);
+CREATE INDEX idx_predictions_merchant_risk ON predictions (merchant_risk_score);
 
 -- Ground Truth / Feedback
 CREATE TABLE IF NOT EXISTS ground_truth (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     transaction_id VARCHAR(100) NOT NULL,
+    prediction_timestamp TIMESTAMP NOT NULL,
     actual_label INTEGER NOT NULL,
     label_source VARCHAR(50),
     feedback_timestamp TIMESTAMP NOT NULL,
     confidence VARCHAR(20),
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (transaction_id) REFERENCES predictions(transaction_id)
+    -- A transaction_id is only unique per prediction_timestamp, so a label
+    -- references the exact prediction it was given for (the latest one
+    -- when it was submitted)
+    FOREIGN KEY (transaction_id, prediction_timestamp)
+        REFERENCES predictions(transaction_id, prediction_timestamp)
 );
 
-CREATE INDEX idx_ground_truth_transaction ON ground_truth(transaction_id);
+CREATE INDEX idx_ground_truth_transaction ON ground_truth(transaction_id, prediction_timestamp);
 CREATE INDEX idx_ground_truth_timestamp ON ground_truth(feedback_timestamp DESC);
 
 -- Feature Statistics (Baseline and Current)
@@ -64,13 +134,13 @@ CREATE TABLE IF NOT EXISTS feature_statistics (
     statistics_type VARCHAR(20) NOT NULL, -- 'baseline' or 'current'
     time_window_start TIMESTAMP,
     time_window_end TIMESTAMP,
-    mean FLOAT,
-    std FLOAT,
-    min FLOAT,
-    max FLOAT,
-    percentile_25 FLOAT,
-    percentile_50 FLOAT,
-    percentile_75 FLOAT,
+    mean REAL,
+    std REAL,
+    min REAL,
+    max REAL,
+    percentile_25 REAL,
+    percentile_50 REAL,
+    percentile_75 REAL,
     distribution JSONB, -- histogram data
     sample_count INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -79,6 +149,7 @@ CREATE TABLE IF NOT EXISTS feature_statistics (
 CREATE INDEX idx_feature_stats_name ON feature_statistics(feature_name);
 CREATE INDEX idx_feature_stats_type ON feature_statistics(statistics_type);
 CREATE INDEX idx_feature_stats_window ON feature_statistics(time_window_start, time_window_end);
+CREATE INDEX idx_feature_stats_distribution_gin ON feature_statistics USING GIN (distribution jsonb_path_ops);
 
 -- Drift Reports
 CREATE TABLE IF NOT EXISTS drift_reports (
@@ -100,6 +171,7 @@ CREATE TABLE IF NOT EXISTS drift_reports (
 
 CREATE INDEX idx_drift_reports_timestamp ON drift_reports(report_timestamp DESC);
 CREATE INDEX idx_drift_reports_status ON drift_reports(overall_status);
+CREATE INDEX idx_drift_reports_details_gin ON drift_reports USING GIN (feature_drift_details jsonb_path_ops);
 
 -- Alerts
 CREATE TABLE IF NOT EXISTS alerts (
@@ -123,53 +195,96 @@ CREATE TABLE IF NOT EXISTS alerts (
 CREATE INDEX idx_alerts_triggered ON alerts(triggered_at DESC);
 CREATE INDEX idx_alerts_severity ON alerts(severity);
 CREATE INDEX idx_alerts_status ON alerts(acknowledged, resolved);
+CREATE INDEX idx_alerts_open_severity_time ON alerts(resolved, severity, triggered_at DESC);
 
 -- Metrics History (Time Series)
 CREATE TABLE IF NOT EXISTS metrics_history (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     timestamp TIMESTAMP NOT NULL,
     model_version VARCHAR(50) NOT NULL,
     predictions_count INTEGER NOT NULL,
     labels_received INTEGER,
-    accuracy FLOAT,
-    precision_score FLOAT,
-    recall_score FLOAT,
-    f1_score FLOAT,
-    auc_roc FLOAT,
-    avg_psi FLOAT,
-    max_psi FLOAT,
-    avg_ks_statistic FLOAT,
+    accuracy REAL,
+    precision_score REAL,
+    recall_score REAL,
+    f1_score REAL,
+    auc_roc REAL,
+    avg_psi REAL,
+    max_psi REAL,
+    avg_ks_statistic REAL,
     drift_alerts_count INTEGER DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS metrics_history_default PARTITION OF metrics_history DEFAULT;
+SELECT create_time_partitions('metrics_history', 'day', 7);
 
 CREATE INDEX idx_metrics_history_timestamp ON metrics_history(timestamp DESC);
 CREATE INDEX idx_metrics_history_model ON metrics_history(model_version);
+CREATE INDEX idx_metrics_history_model_time ON metrics_history(model_version, timestamp DESC);
+
+-- Hourly metrics (materialized; refreshed CONCURRENTLY by the monitoring worker,
+-- which recomputes the whole view but only rewrites the buckets that changed)
+CREATE MATERIALIZED VIEW IF NOT EXISTS metrics_hourly AS
+SELECT
+    date_trunc('hour', p.prediction_timestamp) AS ts,
+    p.model_version,
+    count(*) AS predictions_count,
+    count(g.actual_label) AS labels_received,
+    avg((p.prediction = g.actual_label)::int)::float AS accuracy,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label IS NOT NULL), 0) AS precision_score,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE g.actual_label = 1), 0) AS recall_score,
+    avg(p.prediction_proba)::float AS avg_proba
+FROM predictions p
+LEFT JOIN ground_truth g
+    ON g.transaction_id = p.transaction_id AND g.prediction_timestamp = p.prediction_timestamp
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_hourly_ts_model ON metrics_hourly (ts, model_version);
+
+-- Last refresh time of each materialized view (written by the monitoring worker)
+CREATE TABLE IF NOT EXISTS view_refreshes (
+    view_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL
+);
 
 -- System Health
 CREATE TABLE IF NOT EXISTS system_health (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     timestamp TIMESTAMP NOT NULL,
     component VARCHAR(50) NOT NULL, -- 'api', 'worker', 'database'
     status VARCHAR(20) NOT NULL, -- 'healthy', 'degraded', 'down'
-    cpu_usage FLOAT,
-    memory_usage FLOAT,
-    request_rate FLOAT,
-    error_rate FLOAT,
-    latency_p50 FLOAT,
-    latency_p95 FLOAT,
-    latency_p99 FLOAT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    cpu_usage REAL,
+    memory_usage REAL,
+    request_rate REAL,
+    error_rate REAL,
+    latency_p50 REAL,
+    latency_p95 REAL,
+    latency_p99 REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS system_health_default PARTITION OF system_health DEFAULT;
+SELECT create_time_partitions('system_health', 'week', 4);
 
 CREATE INDEX idx_system_health_timestamp ON system_health(timestamp DESC);
 CREATE INDEX idx_system_health_component ON system_health(component);
+CREATE INDEX idx_system_health_component_time ON system_health(component, timestamp DESC);
 
 -- Create a function to clean old data (retention policy)
 CREATE OR REPLACE FUNCTION clean_old_data(retention_days INTEGER DEFAULT 7)
 RETURNS void AS $$
 BEGIN
-    -- Delete old predictions (keep last N days)
+    -- Labels of expired predictions go first (they reference them)
+    DELETE FROM ground_truth 
+    WHERE prediction_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired prediction partitions, then trim the boundary one
+    PERFORM drop_time_partitions('predictions', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
     DELETE FROM predictions 
     WHERE prediction_timestamp < NOW() - INTERVAL '1 day' * retention_days;
     
@@ -177,7 +292,8 @@ BEGIN
     DELETE FROM drift_reports 
     WHERE report_timestamp < NOW() - INTERVAL '1 day' * retention_days;
     
-    -- Delete old metrics history
+    -- Drop expired metrics history partitions, then trim the boundary one
+    PERFORM drop_time_partitions('metrics_history', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
     DELETE FROM metrics_history 
     WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
     
@@ -186,7 +302,8 @@ BEGIN
     WHERE resolved = TRUE 
     AND resolved_at < NOW() - INTERVAL '1 day' * retention_days;
     
-    -- Delete old system health records
+    -- Drop expired system health partitions, then trim the boundary one
+    PERFORM drop_time_partitions('system_health', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
     DELETE FROM system_health 
     WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
 END;
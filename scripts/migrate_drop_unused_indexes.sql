@@ -0,0 +1,14 @@
+-- Drop predictions indexes that no query reads
+-- For databases created before init_db.sql dropped them. Every index on
+-- predictions is maintained on each prediction write.
+
+BEGIN;
+
+-- Daily partition pruning and the btree indexes on prediction_timestamp
+-- already bound time-window scans
+DROP INDEX IF EXISTS idx_predictions_time_brin;
+
+-- Features are read with ->> (and generated columns), which GIN can't serve
+DROP INDEX IF EXISTS idx_predictions_features_gin;
+
+COMMIT;
@@ -0,0 +1,44 @@
+-- Store the most queried features as generated columns on predictions
+-- For databases created before init_db.sql added them; rewrites predictions once.
+
+BEGIN;
+
+-- Rows from before the features schema was enforced may hold values the
+-- casts below reject (float strings like '14.0' are fine: hour_of_day goes
+-- through numeric); stop with a count rather than mid-rewrite
+DO $$
+DECLARE
+    bad BIGINT;
+BEGIN
+    SELECT count(*) INTO bad
+    FROM predictions
+    WHERE (features ? 'amount' AND jsonb_typeof(features->'amount') NOT IN ('number', 'null')
+           AND features->>'amount' !~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$')
+       OR (features ? 'hour_of_day' AND jsonb_typeof(features->'hour_of_day') NOT IN ('number', 'null')
+           AND features->>'hour_of_day' !~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$')
+       OR (features ? 'merchant_risk_score' AND jsonb_typeof(features->'merchant_risk_score') NOT IN ('number', 'null')
+           AND features->>'merchant_risk_score' !~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$');
+    IF bad > 0 THEN
+        RAISE EXCEPTION '% predictions have non-numeric amount/hour_of_day/merchant_risk_score; fix or remove them first', bad;
+    END IF;
+END;
+$$;
+
+ALTER TABLE predictions
+    ADD COLUMN IF NOT EXISTS amount DOUBLE PRECISION
+        GENERATED ALWAYS AS ((features->>'amount')::float8) STORED,
+    ADD COLUMN IF NOT EXISTS hour_of_day INTEGER
+        GENERATED ALWAYS AS ((features->>'hour_of_day')::numeric::int) STORED,
+    ADD COLUMN IF NOT EXISTS merchant_risk_score DOUBLE PRECISION
+        GENERATED ALWAYS AS ((features->>'merchant_risk_score')::float8) STORED;
+
+-- Replace the expression indexes with plain indexes on the new columns
+DROP INDEX IF EXISTS idx_predictions_amount;
+DROP INDEX IF EXISTS idx_predictions_hour;
+DROP INDEX IF EXISTS idx_predictions_merchant_risk;
+
+CREATE INDEX idx_predictions_amount ON predictions (amount);
+CREATE INDEX idx_predictions_hour ON predictions (hour_of_day);
+CREATE INDEX idx_predictions_merchant_risk ON predictions (merchant_risk_score);
+
+COMMIT;
@@ -0,0 +1,35 @@
+-- Move metrics_hourly's refresh time out of the view into view_refreshes
+-- For databases created before init_db.sql dropped metrics_hourly.refreshed_at
+-- (apply after migrate_predictions_partitions.sql). A now() column changed on
+-- every row at every refresh, so REFRESH ... CONCURRENTLY rewrote the whole view.
+
+BEGIN;
+
+DROP MATERIALIZED VIEW IF EXISTS metrics_hourly;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS metrics_hourly AS
+SELECT
+    date_trunc('hour', p.prediction_timestamp) AS ts,
+    p.model_version,
+    count(*) AS predictions_count,
+    count(g.actual_label) AS labels_received,
+    avg((p.prediction = g.actual_label)::int)::float AS accuracy,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label IS NOT NULL), 0) AS precision_score,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE g.actual_label = 1), 0) AS recall_score,
+    avg(p.prediction_proba)::float AS avg_proba
+FROM predictions p
+LEFT JOIN ground_truth g
+    ON g.transaction_id = p.transaction_id AND g.prediction_timestamp = p.prediction_timestamp
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_hourly_ts_model ON metrics_hourly (ts, model_version);
+
+-- Last refresh time of each materialized view (written by the monitoring worker)
+CREATE TABLE IF NOT EXISTS view_refreshes (
+    view_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL
+);
+
+COMMIT;
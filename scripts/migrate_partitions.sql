@@ -0,0 +1,162 @@
+-- Convert metrics_history (daily) and system_health (weekly) to range-partitioned tables
+-- For databases created before init_db.sql partitioned them. Each table is
+-- renamed, recreated partitioned and refilled; rows outside the created
+-- ranges land in the DEFAULT partition.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION create_time_partitions(parent TEXT, unit TEXT, ahead INTEGER)
+RETURNS void AS $$
+DECLARE
+    step INTERVAL := ('1 ' || unit)::INTERVAL;
+    lower_bound TIMESTAMP := date_trunc(unit, NOW() AT TIME ZONE 'UTC');
+BEGIN
+    FOR i IN 0..ahead LOOP
+        BEGIN
+            EXECUTE 'CREATE TABLE IF NOT EXISTS '
+                || quote_ident(parent || '_p' || to_char(lower_bound, 'YYYYMMDD'))
+                || ' PARTITION OF ' || quote_ident(parent)
+                || ' FOR VALUES FROM (' || quote_literal(lower_bound)
+                || ') TO (' || quote_literal(lower_bound + step) || ')';
+        EXCEPTION WHEN check_violation THEN
+            -- Rows for this range already sit in the DEFAULT partition
+            RAISE WARNING 'Skipping % partition from %: DEFAULT partition has rows in range', parent, lower_bound;
+        END;
+        lower_bound := lower_bound + step;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION drop_time_partitions(parent TEXT, older_than TIMESTAMP)
+RETURNS void AS $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::TIMESTAMP AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent::regclass
+    LOOP
+        -- The DEFAULT partition has no upper bound and is never dropped
+        IF part.upper_bound <= older_than THEN
+            EXECUTE 'DROP TABLE ' || quote_ident(part.relname);
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION clean_old_data(retention_days INTEGER DEFAULT 7)
+RETURNS void AS $$
+BEGIN
+    -- Delete old predictions (keep last N days)
+    DELETE FROM predictions 
+    WHERE prediction_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Delete old drift reports
+    DELETE FROM drift_reports 
+    WHERE report_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired metrics history partitions, then trim the boundary one
+    PERFORM drop_time_partitions('metrics_history', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
+    DELETE FROM metrics_history 
+    WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Delete resolved alerts older than retention
+    DELETE FROM alerts 
+    WHERE resolved = TRUE 
+    AND resolved_at < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired system health partitions, then trim the boundary one
+    PERFORM drop_time_partitions('system_health', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
+    DELETE FROM system_health 
+    WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
+END;
+$$ LANGUAGE plpgsql;
+
+-- v_system_health reads metrics_history; recreated below
+DROP VIEW IF EXISTS v_system_health;
+
+ALTER TABLE metrics_history RENAME TO metrics_history_old;
+ALTER TABLE system_health RENAME TO system_health_old;
+
+-- Free the index names for the partitioned tables
+ALTER INDEX metrics_history_pkey RENAME TO metrics_history_old_pkey;
+ALTER INDEX system_health_pkey RENAME TO system_health_old_pkey;
+DROP INDEX IF EXISTS idx_metrics_history_timestamp, idx_metrics_history_model,
+    idx_metrics_history_model_time, idx_system_health_timestamp,
+    idx_system_health_component, idx_system_health_component_time;
+
+CREATE TABLE IF NOT EXISTS metrics_history (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    timestamp TIMESTAMP NOT NULL,
+    model_version VARCHAR(50) NOT NULL,
+    predictions_count INTEGER NOT NULL,
+    labels_received INTEGER,
+    accuracy REAL,
+    precision_score REAL,
+    recall_score REAL,
+    f1_score REAL,
+    auc_roc REAL,
+    avg_psi REAL,
+    max_psi REAL,
+    avg_ks_statistic REAL,
+    drift_alerts_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS metrics_history_default PARTITION OF metrics_history DEFAULT;
+SELECT create_time_partitions('metrics_history', 'day', 7);
+
+CREATE INDEX idx_metrics_history_timestamp ON metrics_history(timestamp DESC);
+CREATE INDEX idx_metrics_history_model ON metrics_history(model_version);
+CREATE INDEX idx_metrics_history_model_time ON metrics_history(model_version, timestamp DESC);
+
+CREATE TABLE IF NOT EXISTS system_health (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    timestamp TIMESTAMP NOT NULL,
+    component VARCHAR(50) NOT NULL, -- 'api', 'worker', 'database'
+    status VARCHAR(20) NOT NULL, -- 'healthy', 'degraded', 'down'
+    cpu_usage REAL,
+    memory_usage REAL,
+    request_rate REAL,
+    error_rate REAL,
+    latency_p50 REAL,
+    latency_p95 REAL,
+    latency_p99 REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS system_health_default PARTITION OF system_health DEFAULT;
+SELECT create_time_partitions('system_health', 'week', 4);
+
+CREATE INDEX idx_system_health_timestamp ON system_health(timestamp DESC);
+CREATE INDEX idx_system_health_component ON system_health(component);
+CREATE INDEX idx_system_health_component_time ON system_health(component, timestamp DESC);
+
+INSERT INTO metrics_history SELECT * FROM metrics_history_old;
+INSERT INTO system_health SELECT * FROM system_health_old;
+
+DROP TABLE metrics_history_old;
+DROP TABLE system_health_old;
+
+CREATE OR REPLACE VIEW v_system_health AS
+SELECT 
+    m.model_version,
+    m.timestamp as last_metric_time,
+    m.predictions_count,
+    m.accuracy,
+    m.auc_roc,
+    m.max_psi,
+    COUNT(DISTINCT a.id) as open_alerts
+FROM metrics_history m
+LEFT JOIN alerts a ON a.resolved = FALSE
+WHERE m.timestamp > NOW() - INTERVAL '1 hour'
+GROUP BY m.model_version, m.timestamp, m.predictions_count, m.accuracy, m.auc_roc, m.max_psi
+ORDER BY m.timestamp DESC
+LIMIT 1;
+
+COMMIT;
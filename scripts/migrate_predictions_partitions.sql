@@ -0,0 +1,153 @@
+-- Convert predictions to a table range-partitioned daily by prediction_timestamp
+-- For databases created before init_db.sql partitioned it (apply after
+-- migrate_partitions.sql and migrate_generated_features.sql). The table is
+-- renamed, recreated partitioned and refilled; rows outside the created
+-- ranges land in the DEFAULT partition.
+
+BEGIN;
+
+-- metrics_hourly reads predictions; recreated below
+DROP MATERIALIZED VIEW IF EXISTS metrics_hourly;
+
+-- transaction_id is no longer unique on its own: labels reference their
+-- prediction by (transaction_id, prediction_timestamp) instead (added below)
+ALTER TABLE ground_truth DROP CONSTRAINT IF EXISTS ground_truth_transaction_id_fkey;
+ALTER TABLE ground_truth ADD COLUMN IF NOT EXISTS prediction_timestamp TIMESTAMP;
+UPDATE ground_truth g
+SET prediction_timestamp = p.prediction_timestamp
+FROM predictions p
+WHERE p.transaction_id = g.transaction_id
+AND g.prediction_timestamp IS NULL;
+-- Fails if a label has no prediction (the old foreign key prevented that)
+ALTER TABLE ground_truth ALTER COLUMN prediction_timestamp SET NOT NULL;
+
+ALTER TABLE predictions RENAME TO predictions_old;
+
+-- Free the index names for the partitioned table
+ALTER TABLE predictions_old RENAME CONSTRAINT predictions_pkey TO predictions_old_pkey;
+ALTER TABLE predictions_old RENAME CONSTRAINT predictions_transaction_id_key TO predictions_old_transaction_id_key;
+DROP INDEX IF EXISTS idx_predictions_timestamp, idx_predictions_model_version,
+    idx_predictions_model_time, idx_predictions_transaction_id,
+    idx_predictions_time_txn, idx_predictions_time_brin,
+    idx_predictions_features_gin, idx_predictions_amount,
+    idx_predictions_hour, idx_predictions_merchant_risk;
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    transaction_id VARCHAR(100) NOT NULL,
+    model_version VARCHAR(50) NOT NULL,
+    features JSONB NOT NULL,
+    prediction INTEGER NOT NULL,
+    prediction_proba FLOAT NOT NULL,
+    feature_contributions JSONB,
+    prediction_timestamp TIMESTAMP NOT NULL,
+    latency_ms REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    amount DOUBLE PRECISION GENERATED ALWAYS AS ((features->>'amount')::float8) STORED,
+    hour_of_day INTEGER GENERATED ALWAYS AS ((features->>'hour_of_day')::numeric::int) STORED,
+    merchant_risk_score DOUBLE PRECISION GENERATED ALWAYS AS ((features->>'merchant_risk_score')::float8) STORED,
+    PRIMARY KEY (id, prediction_timestamp),
+    UNIQUE (transaction_id, prediction_timestamp)
+) PARTITION BY RANGE (prediction_timestamp);
+
+CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT;
+SELECT create_time_partitions('predictions', 'day', 7);
+
+CREATE INDEX idx_predictions_timestamp ON predictions(prediction_timestamp DESC);
+CREATE INDEX idx_predictions_model_version ON predictions(model_version);
+CREATE INDEX idx_predictions_model_time ON predictions(model_version, prediction_timestamp DESC);
+CREATE INDEX idx_predictions_time_txn ON predictions(prediction_timestamp, transaction_id) INCLUDE (prediction);
+CREATE INDEX idx_predictions_amount ON predictions (amount);
+CREATE INDEX idx_predictions_hour ON predictions (hour_of_day);
+CREATE INDEX idx_predictions_merchant_risk ON predictions (merchant_risk_score);
+
+-- Generated columns are recomputed, not copied
+INSERT INTO predictions (id, transaction_id, model_version, features, prediction,
+    prediction_proba, feature_contributions, prediction_timestamp, latency_ms, created_at)
+SELECT id, transaction_id, model_version, features, prediction,
+    prediction_proba, feature_contributions, prediction_timestamp, latency_ms, created_at
+FROM predictions_old;
+
+DROP TABLE predictions_old;
+
+ALTER TABLE ground_truth ADD FOREIGN KEY (transaction_id, prediction_timestamp)
+    REFERENCES predictions(transaction_id, prediction_timestamp);
+DROP INDEX IF EXISTS idx_ground_truth_transaction;
+CREATE INDEX idx_ground_truth_transaction ON ground_truth(transaction_id, prediction_timestamp);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS metrics_hourly AS
+SELECT
+    date_trunc('hour', p.prediction_timestamp) AS ts,
+    p.model_version,
+    count(*) AS predictions_count,
+    count(g.actual_label) AS labels_received,
+    avg((p.prediction = g.actual_label)::int)::float AS accuracy,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label IS NOT NULL), 0) AS precision_score,
+    count(*) FILTER (WHERE p.prediction = 1 AND g.actual_label = 1)::float
+        / NULLIF(count(*) FILTER (WHERE g.actual_label = 1), 0) AS recall_score,
+    avg(p.prediction_proba)::float AS avg_proba
+FROM predictions p
+LEFT JOIN ground_truth g
+    ON g.transaction_id = p.transaction_id AND g.prediction_timestamp = p.prediction_timestamp
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_hourly_ts_model ON metrics_hourly (ts, model_version);
+
+CREATE OR REPLACE FUNCTION drop_time_partitions(parent TEXT, older_than TIMESTAMP)
+RETURNS void AS $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname,
+               substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::TIMESTAMP AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent::regclass
+    LOOP
+        -- The DEFAULT partition has no upper bound and is never dropped
+        IF part.upper_bound <= older_than THEN
+            -- Detached first: a partition referenced by a foreign key
+            -- can't be dropped directly
+            EXECUTE 'ALTER TABLE ' || quote_ident(parent) || ' DETACH PARTITION ' || quote_ident(part.relname);
+            EXECUTE 'DROP TABLE ' || quote_ident(part.relname);
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION clean_old_data(retention_days INTEGER DEFAULT 7)
+RETURNS void AS $$
+BEGIN
+    -- Labels of expired predictions go first (they reference them)
+    DELETE FROM ground_truth 
+    WHERE prediction_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired prediction partitions, then trim the boundary one
+    PERFORM drop_time_partitions('predictions', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
+    DELETE FROM predictions 
+    WHERE prediction_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Delete old drift reports
+    DELETE FROM drift_reports 
+    WHERE report_timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired metrics history partitions, then trim the boundary one
+    PERFORM drop_time_partitions('metrics_history', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
+    DELETE FROM metrics_history 
+    WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Delete resolved alerts older than retention
+    DELETE FROM alerts 
+    WHERE resolved = TRUE 
+    AND resolved_at < NOW() - INTERVAL '1 day' * retention_days;
+    
+    -- Drop expired system health partitions, then trim the boundary one
+    PERFORM drop_time_partitions('system_health', (NOW() - INTERVAL '1 day' * retention_days)::TIMESTAMP);
+    DELETE FROM system_health 
+    WHERE timestamp < NOW() - INTERVAL '1 day' * retention_days;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,56 @@
+-- Narrow metric/statistic columns from DOUBLE PRECISION (8 bytes) to REAL (4 bytes)
+-- For databases created before init_db.sql switched to REAL; rewrites each table once.
+
+BEGIN;
+
+-- v_system_health reads metrics_history columns; recreated below
+DROP VIEW IF EXISTS v_system_health;
+
+ALTER TABLE predictions
+    ALTER COLUMN latency_ms TYPE REAL USING latency_ms::real;
+
+ALTER TABLE feature_statistics
+    ALTER COLUMN mean TYPE REAL USING mean::real,
+    ALTER COLUMN std TYPE REAL USING std::real,
+    ALTER COLUMN min TYPE REAL USING min::real,
+    ALTER COLUMN max TYPE REAL USING max::real,
+    ALTER COLUMN percentile_25 TYPE REAL USING percentile_25::real,
+    ALTER COLUMN percentile_50 TYPE REAL USING percentile_50::real,
+    ALTER COLUMN percentile_75 TYPE REAL USING percentile_75::real;
+
+ALTER TABLE metrics_history
+    ALTER COLUMN accuracy TYPE REAL USING accuracy::real,
+    ALTER COLUMN precision_score TYPE REAL USING precision_score::real,
+    ALTER COLUMN recall_score TYPE REAL USING recall_score::real,
+    ALTER COLUMN f1_score TYPE REAL USING f1_score::real,
+    ALTER COLUMN auc_roc TYPE REAL USING auc_roc::real,
+    ALTER COLUMN avg_psi TYPE REAL USING avg_psi::real,
+    ALTER COLUMN max_psi TYPE REAL USING max_psi::real,
+    ALTER COLUMN avg_ks_statistic TYPE REAL USING avg_ks_statistic::real;
+
+ALTER TABLE system_health
+    ALTER COLUMN cpu_usage TYPE REAL USING cpu_usage::real,
+    ALTER COLUMN memory_usage TYPE REAL USING memory_usage::real,
+    ALTER COLUMN request_rate TYPE REAL USING request_rate::real,
+    ALTER COLUMN error_rate TYPE REAL USING error_rate::real,
+    ALTER COLUMN latency_p50 TYPE REAL USING latency_p50::real,
+    ALTER COLUMN latency_p95 TYPE REAL USING latency_p95::real,
+    ALTER COLUMN latency_p99 TYPE REAL USING latency_p99::real;
+
+CREATE OR REPLACE VIEW v_system_health AS
+SELECT 
+    m.model_version,
+    m.timestamp as last_metric_time,
+    m.predictions_count,
+    m.accuracy,
+    m.auc_roc,
+    m.max_psi,
+    COUNT(DISTINCT a.id) as open_alerts
+FROM metrics_history m
+LEFT JOIN alerts a ON a.resolved = FALSE
+WHERE m.timestamp > NOW() - INTERVAL '1 hour'
+GROUP BY m.model_version, m.timestamp, m.predictions_count, m.accuracy, m.auc_roc, m.max_psi
+ORDER BY m.timestamp DESC
+LIMIT 1;
+
+COMMIT;
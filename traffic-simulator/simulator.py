@@ -2,13 +2,14 @@
 
 import os
 import sys
+import math
 import time
 import asyncio
 import httpx
 import numpy as np
+import orjson
 from datetime import datetime
 import logging
-import uuid
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +22,33 @@ logger = logging.getLogger(__name__)
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
 DEFAULT_RPS = int(os.getenv("DEFAULT_RPS", "10"))
 
+# Concurrent requests (and pooled keep-alive connections) at most
+MAX_CONNECTIONS = int(os.getenv("MAX_CONNECTIONS", "100"))
+
+# Target rate each request worker has to sustain (~100ms per round trip)
+REQUESTS_PER_WORKER = 10
+
+# Request bodies are serialized with orjson and sent as raw content
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Transactions drawn per refill of the pre-generated feature batches
+BATCH_SIZE = 1024
+
+# Features scaled by the drift multipliers, with their clip bounds per class
+# (is_fraud -> feature -> (low, high))
+SCALED_FEATURE_BOUNDS = {
+    True: {
+        'amount': (50, 10000),
+        'distance_from_home_km': (0, 500),
+        'distance_from_last_txn_km': (0, 500)
+    },
+    False: {
+        'amount': (0.1, 5000),
+        'distance_from_home_km': (0, 100),
+        'distance_from_last_txn_km': (0, 50)
+    }
+}
+
 class TrafficSimulator:
     """Simulate realistic transaction traffic with configurable drift"""
     
@@ -44,67 +72,153 @@ class TrafficSimulator:
             'fraud_rate': 0.02
         }
         self.running = False
+        
+        # Transactions are drawn BATCH_SIZE at a time (both classes mixed)
+        # and dealt out one per request
+        self._rng = np.random.default_rng()
+        self._batch = {}
+        self._batch_labels = []
+        self._batch_idx = 0
+        self._batch_fraud_rate = None
+        self._uniforms = []
+        self._uniform_idx = 0
+        self._transaction_ids = []
     
     def generate_transaction_features(self) -> dict:
         """Generate realistic transaction features with optional drift"""
         
-        # Base fraud probability
-        is_fraud = np.random.random() < self.drift_config['fraud_rate']
+        features, is_fraud = self._next_transaction()
         
         # Apply drift multipliers
-        amount_mult = 1.0 + self.drift_config['amount_shift']
-        distance_mult = 1.0 + self.drift_config['distance_shift']
+        multipliers = {
+            'amount': 1.0 + self.drift_config['amount_shift'],
+            'distance_from_home_km': 1.0 + self.drift_config['distance_shift'],
+            'distance_from_last_txn_km': 1.0 + self.drift_config['distance_shift']
+        }
+        for name, (low, high) in SCALED_FEATURE_BOUNDS[is_fraud].items():
+            features[name] = min(max(features[name] * multipliers[name], low), high)
+        
+        return features, is_fraud
+    
+    def _uniform(self) -> float:
+        """Next pre-drawn uniform [0, 1) value"""
+        if self._uniform_idx >= len(self._uniforms):
+            self._uniforms = self._rng.random(BATCH_SIZE).tolist()
+            self._uniform_idx = 0
+        value = self._uniforms[self._uniform_idx]
+        self._uniform_idx += 1
+        return value
+    
+    def _next_transaction_id(self) -> str:
+        """Next pre-drawn transaction ID (48 random bits, like uuid4().hex[:12])"""
+        if not self._transaction_ids:
+            digits = os.urandom(6 * BATCH_SIZE).hex()
+            self._transaction_ids = [f"txn_{digits[i:i + 12]}" for i in range(0, len(digits), 12)]
+        return self._transaction_ids.pop()
+    
+    def _next_transaction(self) -> tuple:
+        """Next pre-drawn transaction and its label (before drift scaling)"""
+        fraud_rate = self.drift_config['fraud_rate']
+        i = self._batch_idx
+        if i >= len(self._batch_labels) or fraud_rate != self._batch_fraud_rate:
+            # Redrawn on a fraud rate change so it applies from the next
+            # transaction on, like the drift multipliers
+            self._batch, self._batch_labels = self._draw_batch(fraud_rate)
+            self._batch_fraud_rate = fraud_rate
+            i = 0
+        self._batch_idx = i + 1
+        return {name: values[i] for name, values in self._batch.items()}, self._batch_labels[i]
+    
+    def _draw_batch(self, fraud_rate: float) -> tuple:
+        """
+        Draw BATCH_SIZE transactions of both classes
+        
+        The fraud count comes from one binomial draw; each class is then
+        filled with one vectorized call per feature and the rows are
+        shuffled together.
+        
+        Amount and distances are left unscaled and unclipped so a drift
+        change applies from the next transaction on, not the next batch.
+        
+        Args:
+            fraud_rate: Probability of each transaction being fraudulent
+        
+        Returns:
+            (feature name -> list of Python values, list of is_fraud labels)
+        """
+        rng = self._rng
+        n_fraud = int(rng.binomial(BATCH_SIZE, fraud_rate))
+        fraud = self._draw_class(True, n_fraud)
+        legit = self._draw_class(False, BATCH_SIZE - n_fraud)
+        
+        # Fraud rows come first, so a row is fraud iff its source index is
+        order = rng.permutation(BATCH_SIZE)
+        
+        # tolist() yields plain ints/floats/bools, ready for JSON
+        columns = {
+            name: np.concatenate((fraud[name], legit[name]))[order].tolist()
+            for name in fraud
+        }
+        return columns, (order < n_fraud).tolist()
+    
+    def _draw_class(self, is_fraud: bool, n: int) -> dict:
+        """
+        Draw n transactions of one class, one vectorized call per feature
+        
+        Returns:
+            Feature name -> ndarray
+        """
+        rng = self._rng
         
         if is_fraud:
             # Fraudulent transaction patterns
-            features = {
-                'amount': float(np.clip(np.random.gamma(3, 80, 1)[0] * amount_mult, 50, 10000)),
-                'hour_of_day': int(np.random.randint(0, 24)),
-                'day_of_week': int(np.random.randint(0, 7)),
-                'distance_from_home_km': float(np.clip(np.abs(np.random.normal(45, 35)) * distance_mult, 0, 500)),
-                'distance_from_last_txn_km': float(np.clip(np.abs(np.random.normal(30, 40)) * distance_mult, 0, 500)),
-                'time_since_last_txn_mins': float(np.clip(np.abs(np.random.exponential(30)), 1, 1440)),
-                'avg_amount_last_30d': float(np.clip(np.random.gamma(2, 40), 5, 3000)),
-                'num_transactions_24h': int(np.clip(np.random.poisson(8), 0, 50)),
-                'merchant_risk_score': float(np.clip(np.random.beta(5, 2), 0, 1)),
-                'is_international': int(np.random.binomial(1, 0.35)),
-                'card_present': int(np.random.binomial(1, 0.25)),
-                'transaction_velocity': float(np.clip(np.random.gamma(3, 1), 0, 10))
-            }
-        else:
-            # Legitimate transaction patterns
-            features = {
-                'amount': float(np.clip(np.random.gamma(2, 45, 1)[0] * amount_mult, 0.1, 5000)),
-                'hour_of_day': int(np.random.choice(range(6, 23))),
-                'day_of_week': int(np.random.randint(0, 7)),
-                'distance_from_home_km': float(np.clip(np.abs(np.random.normal(8, 12)) * distance_mult, 0, 100)),
-                'distance_from_last_txn_km': float(np.clip(np.abs(np.random.normal(5, 8)) * distance_mult, 0, 50)),
-                'time_since_last_txn_mins': float(np.clip(np.abs(np.random.exponential(120)), 1, 1440)),
-                'avg_amount_last_30d': float(np.clip(np.random.gamma(2, 40), 5, 3000)),
-                'num_transactions_24h': int(np.clip(np.random.poisson(3), 0, 20)),
-                'merchant_risk_score': float(np.clip(np.random.beta(2, 8), 0, 1)),
-                'is_international': int(np.random.binomial(1, 0.05)),
-                'card_present': int(np.random.binomial(1, 0.85)),
-                'transaction_velocity': float(np.clip(np.random.gamma(1.5, 0.5), 0, 5))
+            return {
+                'amount': rng.gamma(3, 80, n),
+                'hour_of_day': rng.integers(0, 24, n),
+                'day_of_week': rng.integers(0, 7, n),
+                'distance_from_home_km': np.abs(rng.normal(45, 35, n)),
+                'distance_from_last_txn_km': np.abs(rng.normal(30, 40, n)),
+                'time_since_last_txn_mins': np.clip(rng.exponential(30, n), 1, 1440),
+                'avg_amount_last_30d': np.clip(rng.gamma(2, 40, n), 5, 3000),
+                'num_transactions_24h': np.clip(rng.poisson(8, n), 0, 50),
+                'merchant_risk_score': rng.beta(5, 2, n),
+                'is_international': rng.binomial(1, 0.35, n),
+                'card_present': rng.binomial(1, 0.25, n),
+                'transaction_velocity': np.clip(rng.gamma(3, 1, n), 0, 10)
             }
         
-        return features, is_fraud
+        # Legitimate transaction patterns
+        return {
+            'amount': rng.gamma(2, 45, n),
+            'hour_of_day': rng.integers(6, 23, n),
+            'day_of_week': rng.integers(0, 7, n),
+            'distance_from_home_km': np.abs(rng.normal(8, 12, n)),
+            'distance_from_last_txn_km': np.abs(rng.normal(5, 8, n)),
+            'time_since_last_txn_mins': np.clip(rng.exponential(120, n), 1, 1440),
+            'avg_amount_last_30d': np.clip(rng.gamma(2, 40, n), 5, 3000),
+            'num_transactions_24h': np.clip(rng.poisson(3, n), 0, 20),
+            'merchant_risk_score': rng.beta(2, 8, n),
+            'is_international': rng.binomial(1, 0.05, n),
+            'card_present': rng.binomial(1, 0.85, n),
+            'transaction_velocity': np.clip(rng.gamma(1.5, 0.5, n), 0, 5)
+        }
     
     async def send_transaction(self, client: httpx.AsyncClient) -> bool:
         """Send a single transaction to the backend"""
         try:
             # Generate transaction
             features, actual_fraud = self.generate_transaction_features()
-            transaction_id = f"txn_{uuid.uuid4().hex[:12]}"
+            transaction_id = self._next_transaction_id()
             
             # Send prediction request
             response = await client.post(
                 f"{self.backend_url}/api/v1/predict",
-                json={
+                content=orjson.dumps({
                     "transaction_id": transaction_id,
                     "features": features,
                     "timestamp": datetime.utcnow().isoformat()
-                },
+                }),
+                headers=JSON_HEADERS,
                 timeout=5.0
             )
             
@@ -112,15 +226,15 @@ class TrafficSimulator:
                 self.successful_requests += 1
                 
                 # Optionally send feedback (10% of the time, simulating delayed labels)
-                if np.random.random() < 0.1:
-                    await self.send_feedback(client, transaction_id, actual_fraud)
+                if self._uniform() < 0.1:
+                    await self.send_feedback(client, transaction_id, int(actual_fraud))
                 
                 return True
             else:
                 self.failed_requests += 1
                 logger.warning(f"Request failed: {response.status_code}")
                 return False
-                
+        
         except Exception as e:
             self.failed_requests += 1
             logger.error(f"Error sending transaction: {e}")
@@ -131,51 +245,89 @@ class TrafficSimulator:
         try:
             await client.post(
                 f"{self.backend_url}/api/v1/feedback",
-                json={
+                content=orjson.dumps({
                     "transaction_id": transaction_id,
                     "actual_label": actual_label,
                     "label_source": "simulator",
                     "confidence": "high"
-                },
+                }),
+                headers=JSON_HEADERS,
                 timeout=5.0
             )
         except Exception as e:
             logger.debug(f"Error sending feedback: {e}")
     
     async def run_traffic_loop(self):
-        """Main traffic generation loop"""
-        logger.info(f"Starting traffic generation: {self.rps} req/sec")
+        """
+        Main traffic generation loop
         
+        A pacer releases one token per request at the target rate; a pool
+        of workers sharing one keep-alive client sends a request per token,
+        so slow responses don't hold back the rate.
+        """
+        n_workers = min(MAX_CONNECTIONS, max(1, math.ceil(self.rps / REQUESTS_PER_WORKER)))
+        logger.info(f"Starting traffic generation: {self.rps} req/sec, {n_workers} workers")
+        
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_CONNECTIONS
+        )
+        async with httpx.AsyncClient(limits=limits, timeout=5.0) as client:
+            tokens = asyncio.Queue(maxsize=n_workers)
+            workers = [
+                asyncio.create_task(self._request_worker(client, tokens))
+                for _ in range(n_workers)
+            ]
+            try:
+                await self._pace(tokens)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def _pace(self, tokens: asyncio.Queue):
+        """Release request tokens at self.rps (blocks while all workers are busy)"""
+        loop = asyncio.get_running_loop()
         interval = 1.0 / self.rps  # Time between requests
+        next_at = loop.time()
         
-        async with httpx.AsyncClient() as client:
-            while self.running:
-                try:
-                    start_time = time.time()
-                    
-                    # Send transaction
-                    await self.send_transaction(client)
-                    self.total_requests += 1
-                    
-                    # Log stats periodically
-                    if self.total_requests % 100 == 0:
-                        success_rate = (self.successful_requests / self.total_requests * 100) if self.total_requests > 0 else 0
-                        logger.info(
-                            f"Traffic stats: Total={self.total_requests}, "
-                            f"Success={self.successful_requests}, "
-                            f"Failed={self.failed_requests}, "
-                            f"Success Rate={success_rate:.1f}%, "
-                            f"Drift={'ON' if self.drift_config['enabled'] else 'OFF'}"
-                        )
-                    
-                    # Maintain rate
-                    elapsed = time.time() - start_time
-                    sleep_time = max(0, interval - elapsed)
-                    await asyncio.sleep(sleep_time)
-                    
-                except Exception as e:
-                    logger.error(f"Error in traffic loop: {e}")
-                    await asyncio.sleep(1)
+        while self.running:
+            await tokens.put(None)
+            
+            # Maintain rate on an absolute schedule, catching up after short
+            # stalls but not bursting after long ones
+            next_at += interval
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -1.0:
+                next_at = loop.time()
+    
+    async def _request_worker(self, client: httpx.AsyncClient, tokens: asyncio.Queue):
+        """Send one transaction per token"""
+        while True:
+            await tokens.get()
+            try:
+                # Send transaction (counted up front, as others may finish first)
+                self.total_requests += 1
+                request_number = self.total_requests
+                await self.send_transaction(client)
+                
+                # Log stats periodically
+                if request_number % 100 == 0:
+                    success_rate = (self.successful_requests / self.total_requests * 100) if self.total_requests > 0 else 0
+                    logger.info(
+                        f"Traffic stats: Total={self.total_requests}, "
+                        f"Success={self.successful_requests}, "
+                        f"Failed={self.failed_requests}, "
+                        f"Success Rate={success_rate:.1f}%, "
+                        f"Drift={'ON' if self.drift_config['enabled'] else 'OFF'}"
+                    )
+            
+            except Exception as e:
+                logger.error(f"Error in traffic loop: {e}")
+            finally:
+                tokens.task_done()
     
     def enable_drift(self, amount_shift: float = 0.3, distance_shift: float = 0.5, fraud_rate: float = 0.05):
         """